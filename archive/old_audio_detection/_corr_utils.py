@@ -0,0 +1,402 @@
+"""
+Shared audio loading, correlation + peak-picking helpers for the pattern
+matching scripts.
+
+robust_search_system.py, test_improved_pattern_matching.py and
+test_new_video.py all run the same normalize -> correlate -> threshold ->
+peak-pick pipeline; it lives here so changes to it land in one place.
+"""
+
+import hashlib
+import math
+import os
+import subprocess
+from pathlib import Path
+import numpy as np
+from scipy import fft as sp_fft
+from scipy import signal
+import soundfile as sf
+
+# Above this audio/reference length ratio a single full-length FFT wastes
+# memory bandwidth, so correlate block-wise with overlap-add instead
+OVERLAP_ADD_RATIO = 16
+
+# References shorter than this correlate faster directly (np.correlate's
+# vectorized dot-product loop) than through any FFT path
+SHORT_REF_SAMPLES = 256
+
+# Decoded audio kept by load_audio_cached, relative to the working directory
+AUDIO_CACHE_DIR = Path(".audio_cache")
+
+
+def load_audio_ffmpeg(file_path, sr, offset=None, duration=None):
+    """
+    Decode audio to mono float32 PCM at sr by piping it straight out of ffmpeg.
+
+    Much faster than librosa.load on .webm, which goes through audioread and
+    copies the decoded stream in small Python-side chunks.
+    """
+    cmd = ["ffmpeg", "-v", "quiet"]
+    if offset:
+        cmd += ["-ss", str(offset)]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    cmd += ["-i", str(file_path), "-f", "f32le", "-acodec", "pcm_f32le",
+            "-ac", "1", "-ar", str(sr), "-"]
+
+    proc = subprocess.run(cmd, capture_output=True, check=True)
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def load_wav(file_path, sr):
+    """
+    Read a WAV (or other libsndfile format) as mono float32 at sr.
+
+    Reads with soundfile directly and only resamples, with resample_poly,
+    when the file's rate differs - the reference clips are already at the
+    working rate, so librosa.load's decode + resample pass is pure overhead.
+    """
+    audio, file_sr = sf.read(file_path, dtype='float32')
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if file_sr != sr:
+        g = math.gcd(int(sr), int(file_sr))
+        audio = signal.resample_poly(audio, int(sr) // g, int(file_sr) // g).astype(np.float32)
+    return audio
+
+
+def load_audio_cached(file_path, sr, duration=None, cache_dir=AUDIO_CACHE_DIR, decode=None):
+    """
+    load_audio_ffmpeg, memoized on disk as .npy keyed on (path, sr, duration)
+    and the source file's size and modification time.
+
+    The first call decodes and saves; later calls (from any script) memory-map
+    the saved samples instead of decoding again. The map is copy-on-write, so
+    callers may still normalize the returned array in place.
+
+    The cache is only ever a shortcut: an unreadable entry is decoded again
+    and rewritten, and if the cache can't be written the decoded samples are
+    returned directly.
+
+    Args:
+        decode: Optional decode(file_path, sr, duration) to use instead of
+            load_audio_ffmpeg; its name is part of the key, so different
+            decoders never share entries
+    """
+    stat = os.stat(file_path)
+    key = f"{Path(file_path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{sr}|{duration}"
+    if decode is not None:
+        key += f"|{decode.__module__}.{decode.__qualname__}"
+    cache_file = Path(cache_dir) / (hashlib.sha1(key.encode()).hexdigest() + ".npy")
+
+    if cache_file.exists():
+        try:
+            return np.asarray(np.load(cache_file, mmap_mode='c'))
+        except (OSError, ValueError):
+            pass  # Truncated or corrupt entry; decode again and replace it
+
+    if decode is None:
+        audio = load_audio_ffmpeg(file_path, sr, duration=duration)
+    else:
+        audio = np.asarray(decode(file_path, sr, duration), dtype=np.float32)
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Write under a temporary name so a crash never leaves a partial entry
+        tmp_file = cache_file.with_suffix(".tmp.npy")
+        np.save(tmp_file, audio)
+        os.replace(tmp_file, cache_file)
+        return np.asarray(np.load(cache_file, mmap_mode='c'))
+    except (OSError, ValueError) as e:
+        print(f"Audio cache unavailable ({e}); using the decoded samples directly")
+        return audio if audio.flags.writeable else audio.copy()
+
+
+def stream_audio_ffmpeg(file_path, sr, block_size=2**20, duration=None):
+    """
+    Yield mono float32 PCM at sr in blocks of up to block_size samples,
+    decoded by ffmpeg, without ever holding the whole file in memory.
+    """
+    cmd = ["ffmpeg", "-v", "quiet"]
+    if duration is not None:
+        cmd += ["-t", str(duration)]
+    cmd += ["-i", str(file_path), "-f", "f32le", "-acodec", "pcm_f32le",
+            "-ac", "1", "-ar", str(sr), "-"]
+
+    bytes_per_block = block_size * np.dtype(np.float32).itemsize
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE) as proc:
+        while True:
+            data = proc.stdout.read(bytes_per_block)
+            if not data:
+                break
+            # The final read may end mid-sample; keep whole samples only
+            usable = len(data) - len(data) % 4
+            yield np.frombuffer(data[:usable], dtype=np.float32)
+
+        # A missing or undecodable file only shows up as an early end of
+        # stream, so fail here as load_audio_ffmpeg's check=True does rather
+        # than let the caller treat a partial decode as the whole file
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+def absmax(x, block=1 << 18):
+    """Peak absolute amplitude without allocating an np.abs(x) temporary."""
+    # min and max are taken block by block so the second scan of each block
+    # hits cache instead of reading the whole signal from memory twice
+    x = x.ravel()
+    lo, hi = x[:block].min(), x[:block].max()
+    for start in range(block, x.size, block):
+        chunk = x[start:start + block]
+        lo = min(lo, chunk.min())
+        hi = max(hi, chunk.max())
+    return max(-lo, hi)
+
+
+def fft_length(n_audio):
+    """FFT size used by correlate_valid for an audio signal of n_audio samples."""
+    return sp_fft.next_fast_len(n_audio, real=True)
+
+
+def correlate_valid(audio_norm, ref_norm, ref_fft=None, out=None):
+    """
+    'valid'-mode cross-correlation divided by len(ref_norm), via float32 FFT.
+
+    Very short references are correlated directly. Long audio against a
+    short reference goes through overlap-add (signal.oaconvolve, blocks
+    padded to next_fast_len); otherwise, or when a precomputed ref_fft is
+    given, one full-length FFT is used.
+
+    Args:
+        audio_norm: Normalized audio signal
+        ref_norm: Normalized reference pattern
+        ref_fft: Optional precomputed conj(rfft(ref_norm, nfft)) for this nfft
+        out: Optional float32 buffer of at least the output length to write into
+
+    Returns:
+        Correlation array (a view of out when given)
+    """
+    # Stay in single precision: scipy.fft keeps float32 -> complex64
+    audio_norm = audio_norm.astype(np.float32, copy=False)
+    ref_norm = ref_norm.astype(np.float32, copy=False)
+
+    n_out = len(audio_norm) - len(ref_norm) + 1
+    if out is None:
+        out = np.empty(n_out, dtype=np.float32)
+
+    if ref_fft is None and len(ref_norm) < SHORT_REF_SAMPLES:
+        full = np.correlate(audio_norm, ref_norm, mode='valid')
+    elif ref_fft is None and len(audio_norm) > OVERLAP_ADD_RATIO * len(ref_norm):
+        # Correlation = convolution with the time-reversed reference
+        with sp_fft.set_workers(-1):
+            full = signal.oaconvolve(audio_norm, ref_norm[::-1], mode='valid')
+    else:
+        nfft = fft_length(len(audio_norm))
+        if ref_fft is None:
+            ref_fft = np.conj(sp_fft.rfft(ref_norm, nfft, workers=-1))
+        full = sp_fft.irfft(sp_fft.rfft(audio_norm, nfft, workers=-1) * ref_fft, nfft, workers=-1)
+
+    return np.divide(full[:n_out], np.float32(len(ref_norm)), out=out[:n_out])
+
+
+class PatternMatcher:
+    """
+    Overlap-save FFT correlation against one reference pattern. The
+    reference spectrum is computed once and reused for every block of every
+    audio signal correlated with it.
+
+    Only the reference is zero-padded: the audio is cut into overlapping
+    frames of the FFT size (twice the reference length, at least 2^16) and
+    never transformed at full length.
+    """
+
+    # Frames transformed per batched rfft/irfft call (~2^20 samples)
+    BATCH_SAMPLES = 2**20
+
+    # Smallest frame used. A frame twice the reference only yields half its
+    # length in valid outputs, so for short references a longer frame wastes
+    # less of each transform; past ~2^16 points the gain is lost to cache
+    # misses (measured on a 20-minute signal, reference lengths 0.2-5 s)
+    MIN_FFT_SIZE = 2**16
+
+    def __init__(self, ref_norm, fft_size=None):
+        self.ref_norm = ref_norm.astype(np.float32, copy=False)
+        ref_len = len(self.ref_norm)
+        self.nfft = fft_size or fft_length(max(2 * ref_len, self.MIN_FFT_SIZE))
+        self.step = self.nfft - ref_len + 1  # Valid outputs per frame
+        self.ref_fft = np.conj(sp_fft.rfft(self.ref_norm, self.nfft, workers=-1))
+
+    def correlate(self, audio_norm, scale=1.0):
+        """
+        'valid'-mode cross-correlation divided by len(ref), as correlate_valid.
+
+        Correlation is linear in the audio, so unnormalized audio can be
+        passed with scale=1/peak: the scaling rides along with the division
+        by len(ref) instead of costing a separate pass over the audio.
+        """
+        # float32 is the narrowest type worth using here: the FFTs need
+        # floating point, and np.correlate on int16 would accumulate (and
+        # overflow) in int16
+        audio_norm = audio_norm.astype(np.float32, copy=False)
+        ref_len = len(self.ref_norm)
+        factor = np.float32(scale / ref_len)
+
+        if ref_len < SHORT_REF_SAMPLES:
+            correlation = np.correlate(audio_norm, self.ref_norm, mode='valid')
+        else:
+            correlation = self._correlate_frames(audio_norm)
+        correlation *= factor
+        return correlation
+
+    def correlate_blocks(self, blocks):
+        """
+        Like correlate(), but for raw audio arriving as an iterable of blocks
+        (e.g. stream_audio_ffmpeg), so the audio is never held in memory all
+        at once. Correlation is linear in the audio, so peak normalization is
+        left to the caller: divide the correlation by the returned peak.
+
+        Returns:
+            (correlation, audio_peak)
+        """
+        ref_len = len(self.ref_norm)
+        pieces = []
+        tail = np.zeros(0, dtype=np.float32)  # Last len(ref)-1 input samples
+        audio_peak = 0.0
+
+        for block in blocks:
+            block = block.astype(np.float32, copy=False)
+            audio_peak = max(audio_peak, absmax(block))
+
+            segment = np.concatenate([tail, block])
+            if len(segment) >= ref_len:
+                pieces.append(self._correlate_frames(segment))
+            tail = segment[max(0, len(segment) - (ref_len - 1)):]
+
+        if not pieces:
+            # Audio shorter than the reference has no 'valid' lags
+            return np.zeros(0, dtype=np.float32), audio_peak
+
+        return np.concatenate(pieces) / np.float32(ref_len), audio_peak
+
+    def _correlate_frames(self, audio):
+        """Unscaled 'valid'-mode correlation of audio, frame by frame."""
+        ref_len = len(self.ref_norm)
+        n_out = len(audio) - ref_len + 1
+        if n_out <= 0:
+            return np.zeros(0, dtype=np.float32)
+
+        out = np.empty(n_out, dtype=np.float32)
+
+        # Frames lying entirely inside the audio, as a strided view
+        n_full = max(0, (len(audio) - self.nfft) // self.step + 1)
+        if n_full > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(audio, self.nfft)[::self.step]
+        batch = max(1, self.BATCH_SAMPLES // self.nfft)
+        for start in range(0, n_full, batch):
+            spec = sp_fft.rfft(frames[start:min(start + batch, n_full)], axis=-1, workers=-1)
+            corr = sp_fft.irfft(spec * self.ref_fft, self.nfft, axis=-1, workers=-1)
+            out[start * self.step:(start + len(corr)) * self.step] = corr[:, :self.step].ravel()
+
+        # Remaining outputs from a zero-padded final frame
+        done = n_full * self.step
+        if done < n_out:
+            last = sp_fft.irfft(sp_fft.rfft(audio[done:], self.nfft, workers=-1) * self.ref_fft, self.nfft, workers=-1)
+            out[done:] = last[:n_out - done]
+
+        return out
+
+
+def pick_peaks(correlation, threshold, min_gap_samples):
+    """
+    Find local maxima above threshold, keeping only the strongest peak
+    within each min_gap_samples neighbourhood.
+
+    Same result as signal.find_peaks(height=..., distance=...) (except that
+    a flat-topped peak is reported at its left edge, not its middle), but
+    only the samples above threshold - a tiny fraction of a full-video
+    correlation - are ever compared or gap-suppressed.
+    """
+    candidates = np.flatnonzero(correlation >= threshold)
+    candidates = candidates[(candidates > 0) & (candidates < len(correlation) - 1)]
+
+    values = correlation[candidates]
+    is_peak = (values > correlation[candidates - 1]) & (values >= correlation[candidates + 1])
+    candidates = candidates[is_peak]
+
+    # Greedy suppression, strongest first, with one iteration per *kept*
+    # peak rather than per candidate: the strongest candidate not yet
+    # suppressed can't have a kept peak within the gap, so it is kept, and
+    # every candidate within the gap of it is knocked out as a slice of the
+    # position-sorted array
+    scores = correlation[candidates].astype(np.float64)
+    kept = []
+    while len(scores):
+        best = int(np.argmax(scores))  # First of equal scores = leftmost
+        if scores[best] == -np.inf:
+            break
+        idx = int(candidates[best])
+        kept.append(idx)
+        lo = np.searchsorted(candidates, idx - min_gap_samples, side='right')
+        hi = np.searchsorted(candidates, idx + min_gap_samples, side='left')
+        scores[lo:hi] = -np.inf
+
+    return np.array(sorted(kept), dtype=np.intp)
+
+
+def peak_times_scores(peak_indices, correlation, sr):
+    """Peak times in seconds and their scores as arrays, best score first."""
+    times = peak_indices / sr
+    scores = correlation[peak_indices]
+    order = np.argsort(-scores, kind='stable')
+    return times[order], scores[order]
+
+
+def best_match_per_known(times, known_times, tolerance):
+    """
+    For each known time, the index of the best-scoring detection within
+    tolerance seconds of it, or -1 if there is none.
+
+    times must be sorted best score first (as from peak_times_scores), so
+    the first detection inside the tolerance is the best one.
+    """
+    known_times = np.asarray(known_times)
+    if len(times) == 0:
+        return np.full(len(known_times), -1)
+
+    within = np.abs(times[:, None] - known_times[None, :]) <= tolerance
+    return np.where(within.any(axis=0), within.argmax(axis=0), -1)
+
+
+def format_mmss(times, minute_width=2):
+    """'m:ss' labels for times in seconds, with minutes right-aligned to minute_width."""
+    minutes, seconds = np.divmod(np.asarray(times, dtype=float).astype(int), 60)
+    return [f"{mm:{minute_width}d}:{ss:02d}" for mm, ss in zip(minutes.tolist(), seconds.tolist())]
+
+
+def correlate_and_peak(audio_norm, ref_norm, sr, percentile=99.5, min_gap_s=20.0,
+                       correlate=correlate_valid):
+    """
+    Correlate a normalized reference against normalized audio and pick peaks
+    above a percentile threshold.
+
+    Args:
+        audio_norm: Normalized audio signal
+        ref_norm: Normalized reference pattern
+        sr: Sample rate of both signals
+        percentile: Correlation percentile used as the detection threshold
+        min_gap_s: Minimum gap between detections in seconds
+        correlate: Correlation function, e.g. a caching wrapper of correlate_valid
+
+    Returns:
+        (matches, threshold, correlation) with matches as [(time_sec, score)]
+        sorted by score, best first
+    """
+    correlation = correlate(audio_norm, ref_norm)
+
+    threshold = np.percentile(correlation, percentile)
+    peak_indices = pick_peaks(correlation, threshold, int(min_gap_s * sr))
+
+    times, scores = peak_times_scores(peak_indices, correlation, sr)
+    matches = list(zip(times.tolist(), scores.tolist()))
+
+    return matches, threshold, correlation
@@ -27,9 +27,9 @@ def analyze_chronological_transitions():
     print(f"Analyzing {len(audio_data)/audio_sr/60:.1f} minutes of audio")
     
     # Compute correlation
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
+    ref_normalized = (reference_pattern / np.max(np.abs(reference_pattern))).astype(np.float32, copy=False)
+    audio_normalized = (audio_data / np.max(np.abs(audio_data))).astype(np.float32, copy=False)
+    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid', method='fft')
     correlation = correlation / len(ref_normalized)
     
     # Use a moderately selective threshold
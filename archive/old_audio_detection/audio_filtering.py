@@ -9,17 +9,35 @@ inning transition detection accuracy.
 import librosa
 import numpy as np
 import soundfile as sf
+from scipy import fft as sp_fft
 from scipy import signal
+from scipy.ndimage import uniform_filter1d
 from pathlib import Path
 import matplotlib.pyplot as plt
 
+# Have librosa's STFTs go through scipy.fft, which can use every core. This
+# is a process-wide librosa setting (it affects every librosa FFT in the
+# process, not just this module's), so it is made once, at import
+librosa.set_fftlib(sp_fft)
+
 class AudioFilter:
+    # Band where game sounds sit above most commentary energy (Hz)
+    GAME_BAND_HZ = (800, 10000)
+    
+    # Samples per block when frequency_band_filter writes into a buffer
+    FILTER_BLOCK = 2**16
+    
     def __init__(self):
         """
         Initialize the audio filtering system.
         """
         self.sample_rate = 22050
         
+        # Noise profiles already estimated, keyed on the noise stretch's samples,
+        # so re-filtering the same audio (e.g. with several filter configs)
+        # skips that STFT
+        self._noise_profile_cache = {}
+        
     def load_audio(self, file_path, duration=None):
         """
         Load audio file for filtering.
@@ -27,38 +45,79 @@ class AudioFilter:
         audio_data, sr = librosa.load(file_path, sr=self.sample_rate, duration=duration)
         return audio_data, sr
     
-    def spectral_subtraction_filter(self, audio_data, noise_reduction=0.5):
+    def _estimate_noise_profile(self, audio_data):
+        """
+        Mean STFT magnitude per bin over the first 2 seconds, assumed to be
+        commentary.
+        """
+        # Estimate noise floor from a short STFT of just that stretch
+        noise_frames = int(2.0 * self.sample_rate / 512)  # 2 seconds worth of frames
+        noise_audio = audio_data[:noise_frames * 512]
+        cache_key = hash(noise_audio.tobytes())
+        noise_profile = self._noise_profile_cache.get(cache_key)
+        if noise_profile is None:
+            with sp_fft.set_workers(-1):
+                noise_stft = librosa.stft(noise_audio, n_fft=2048, hop_length=512)
+            noise_profile = np.mean(np.abs(noise_stft[:, :noise_frames]), axis=1, keepdims=True)
+            self._noise_profile_cache[cache_key] = noise_profile
+        return noise_profile
+    
+    def _subtraction_gain(self, magnitude, noise_profile, noise_reduction, band=None):
+        """
+        Per-bin spectral subtraction gain for an STFT magnitude, computed in
+        place in magnitude's buffer.
+        """
+        # Spectral subtraction as a per-bin gain on the complex STFT, which
+        # keeps the phase without an angle()/exp(1j*phase) round trip:
+        #   (magnitude - noise) / magnitude = 1 - noise / magnitude
+        # Every step reuses the one magnitude-sized buffer.
+        gain = magnitude
+        gain += 1e-12
+        np.divide(noise_reduction * noise_profile, gain, out=gain)
+        np.subtract(1.0, gain, out=gain)
+        
+        # Ensure we don't go below 10% of original magnitude
+        np.maximum(gain, 0.1, out=gain)
+        
+        # Drop bins outside the requested band entirely
+        if band is not None:
+            freqs = librosa.fft_frequencies(sr=self.sample_rate, n_fft=2048)
+            gain[(freqs < band[0]) | (freqs > band[1]), :] = 0.0
+        
+        return gain
+    
+    def spectral_subtraction_filter(self, audio_data, noise_reduction=0.5, band=None):
         """
         Use spectral subtraction to reduce commentary.
         This estimates the noise (commentary) profile and subtracts it.
+        
+        If band=(low_hz, high_hz) is given, STFT bins outside it are zeroed
+        as well, band-limiting the audio in the same pass.
         """
         print("Applying spectral subtraction filter...")
         
-        # Convert to frequency domain
-        stft = librosa.stft(audio_data, n_fft=2048, hop_length=512)
-        magnitude = np.abs(stft)
-        phase = np.angle(stft)
-        
-        # Estimate noise floor (first 2 seconds assumed to have commentary)
-        noise_frames = int(2.0 * self.sample_rate / 512)  # 2 seconds worth of frames
-        noise_profile = np.mean(magnitude[:, :noise_frames], axis=1, keepdims=True)
+        noise_profile = self._estimate_noise_profile(audio_data)
         
-        # Spectral subtraction
-        magnitude_cleaned = magnitude - (noise_reduction * noise_profile)
-        
-        # Ensure we don't go below 10% of original magnitude
-        magnitude_cleaned = np.maximum(magnitude_cleaned, 0.1 * magnitude)
+        # Convert to frequency domain
+        with sp_fft.set_workers(-1):
+            stft = librosa.stft(audio_data, n_fft=2048, hop_length=512)
         
         # Reconstruct audio
-        stft_cleaned = magnitude_cleaned * np.exp(1j * phase)
-        audio_cleaned = librosa.istft(stft_cleaned, hop_length=512)
+        stft *= self._subtraction_gain(np.abs(stft), noise_profile, noise_reduction, band)
+        with sp_fft.set_workers(-1):
+            audio_cleaned = librosa.istft(stft, hop_length=512)
         
         return audio_cleaned
     
-    def frequency_band_filter(self, audio_data):
+    def frequency_band_filter(self, audio_data, out=None):
         """
         Filter to emphasize frequency bands where game sounds typically occur.
         Game sounds often have more mid-high frequency content than speech.
+        
+        If out is given (e.g. a float32 buffer, or audio_data itself when it
+        is writable), the audio is filtered block by block into it, carrying
+        the filter state across blocks: same result, but no full-length
+        float64 intermediate.
         """
         print("Applying frequency band filter...")
         
@@ -66,14 +125,23 @@ class AudioFilter:
         # Commentary is typically 100Hz - 3kHz, so we emphasize higher frequencies
         
         # High-pass filter to reduce low-frequency speech
-        sos_hp = signal.butter(4, 800, btype='high', fs=self.sample_rate, output='sos')
-        audio_hp = signal.sosfilt(sos_hp, audio_data)
+        low_hz, high_hz = self.GAME_BAND_HZ
+        sos_hp = signal.butter(4, low_hz, btype='high', fs=self.sample_rate, output='sos')
         
         # Slight low-pass to remove very high frequency noise
-        sos_lp = signal.butter(4, 10000, btype='low', fs=self.sample_rate, output='sos')
-        audio_filtered = signal.sosfilt(sos_lp, audio_hp)
+        sos_lp = signal.butter(4, high_hz, btype='low', fs=self.sample_rate, output='sos')
+        
+        # Cascade both filters' sections so the audio is filtered in one pass
+        sos = np.concatenate([sos_hp, sos_lp])
+        if out is None:
+            return signal.sosfilt(sos, audio_data)
         
-        return audio_filtered
+        zi = np.zeros((sos.shape[0], 2))
+        for start in range(0, len(audio_data), self.FILTER_BLOCK):
+            stop = start + self.FILTER_BLOCK
+            out[start:stop], zi = signal.sosfilt(sos, audio_data[start:stop], zi=zi)
+        
+        return out
     
     def dynamic_range_compression(self, audio_data, threshold=0.3, ratio=4.0):
         """
@@ -82,17 +150,11 @@ class AudioFilter:
         """
         print("Applying dynamic range compression...")
         
-        # Simple compression algorithm
-        compressed = np.copy(audio_data)
-        
-        # Find samples above threshold
-        above_threshold = np.abs(compressed) > threshold
-        
-        # Apply compression to loud samples
-        compressed[above_threshold] = (
-            np.sign(compressed[above_threshold]) * 
-            (threshold + (np.abs(compressed[above_threshold]) - threshold) / ratio)
-        )
+        # Simple compression algorithm, branchless: samples at or below the
+        # threshold have no excess and pass through unchanged
+        abs_audio = np.abs(audio_data)
+        excess = np.maximum(abs_audio - threshold, 0.0)
+        compressed = np.sign(audio_data) * (np.minimum(abs_audio, threshold) + excess / ratio)
         
         return compressed
     
@@ -106,22 +168,23 @@ class AudioFilter:
         attack_samples = int(attack_time * self.sample_rate)
         release_samples = int(release_time * self.sample_rate)
         
-        # Calculate envelope
-        envelope = np.abs(audio_data)
+        # RMS envelope over 10ms blocks (100 Hz) - the gate only follows
+        # sub-second dynamics, so there is no need to track it per sample
+        block = max(1, int(0.01 * self.sample_rate))
+        starts = np.arange(0, len(audio_data), block)
+        counts = np.diff(np.append(starts, len(audio_data)))
+        envelope = np.sqrt(np.add.reduceat(np.square(audio_data), starts) / counts)
         
-        # Smooth envelope
-        window_size = int(0.01 * self.sample_rate)  # 10ms window
-        envelope_smooth = np.convolve(envelope, np.ones(window_size)/window_size, mode='same')
+        # Smooth envelope across neighbouring blocks
+        envelope_smooth = uniform_filter1d(envelope, size=2, mode='nearest')
         
-        # Generate gate signal
-        gate = np.ones_like(audio_data)
-        
-        # Apply gating based on envelope
-        below_threshold = envelope_smooth < gate_threshold
-        gate[below_threshold] = 0.1  # Reduce to 10% instead of complete silence
+        # Generate gate signal per block, reduced to 10% instead of complete
+        # silence where the envelope is below threshold, then back to full rate
+        gate_blocks = np.where(envelope_smooth < gate_threshold, 0.1, 1.0).astype(audio_data.dtype)
+        gate = np.repeat(gate_blocks, counts)
         
         # Smooth gate transitions
-        gate = np.convolve(gate, np.ones(attack_samples)/attack_samples, mode='same')
+        gate = uniform_filter1d(gate, size=attack_samples, mode='nearest')
         
         return audio_data * gate
     
@@ -140,13 +203,57 @@ class AudioFilter:
         print("Applying combined audio filtering...")
         filtered_audio = np.copy(audio_data)
         
-        # Apply filters in sequence
-        if filter_config.get('frequency_band', True):
+        # Apply filters in sequence. With spectral subtraction on, the band
+        # filter is folded into its STFT (out-of-band bins zeroed) rather than
+        # run as a separate time-domain pass
+        use_band = filter_config.get('frequency_band', True)
+        if filter_config.get('spectral_subtraction', True):
+            band = self.GAME_BAND_HZ if use_band else None
+            filtered_audio = self.spectral_subtraction_filter(filtered_audio, noise_reduction=0.3, band=band)
+        elif use_band:
             filtered_audio = self.frequency_band_filter(filtered_audio)
         
-        if filter_config.get('spectral_subtraction', True):
-            filtered_audio = self.spectral_subtraction_filter(filtered_audio, noise_reduction=0.3)
+        return self._finish_filter_chain(filtered_audio, filter_config)
+    
+    def apply_combined_filter_batch(self, audio_data, filter_configs):
+        """
+        Apply several filter configurations to the same audio.
         
+        Equivalent to calling apply_combined_filter once per config, but the
+        STFT of the audio (and its noise profile) is computed a single time
+        and shared by every config that uses spectral subtraction; each of
+        those then only pays for its own gain and inverse STFT.
+        """
+        print(f"Applying {len(filter_configs)} combined audio filters...")
+        
+        stft = None
+        results = []
+        for filter_config in filter_configs:
+            use_band = filter_config.get('frequency_band', True)
+            if filter_config.get('spectral_subtraction', True):
+                if stft is None:
+                    noise_profile = self._estimate_noise_profile(audio_data)
+                    with sp_fft.set_workers(-1):
+                        stft = librosa.stft(audio_data, n_fft=2048, hop_length=512)
+                    magnitude = np.abs(stft)
+                band = self.GAME_BAND_HZ if use_band else None
+                gain = self._subtraction_gain(magnitude.copy(), noise_profile, 0.3, band)
+                with sp_fft.set_workers(-1):
+                    filtered_audio = librosa.istft(stft * gain, hop_length=512)
+            elif use_band:
+                filtered_audio = self.frequency_band_filter(audio_data)
+            else:
+                filtered_audio = np.copy(audio_data)
+            
+            results.append(self._finish_filter_chain(filtered_audio, filter_config))
+        
+        return results
+    
+    def _finish_filter_chain(self, filtered_audio, filter_config):
+        """
+        Compression, noise gate and output normalization - the filter stages
+        that follow spectral subtraction / band filtering.
+        """
         if filter_config.get('compression', True):
             filtered_audio = self.dynamic_range_compression(filtered_audio)
         
@@ -226,14 +333,14 @@ def test_audio_filtering():
                 {"name": "combined_full", "config": {"spectral_subtraction": True, "frequency_band": True, "compression": True, "noise_gate": True}},
             ]
             
-            for filter_set in filter_configs:
+            filtered_segments = filter_system.apply_combined_filter_batch(
+                test_segment,
+                [f['config'] for f in filter_configs]
+            )
+            
+            for filter_set, filtered_audio in zip(filter_configs, filtered_segments):
                 print(f"  Testing: {filter_set['name']}")
                 
-                filtered_audio = filter_system.apply_combined_filter(
-                    test_segment, 
-                    filter_set['config']
-                )
-                
                 # Save filtered version
                 filtered_file = output_dir / f"{video['name'].lower().replace(' ', '_')}_{filter_set['name']}.wav"
                 filter_system.save_filtered_audio(filtered_audio, str(filtered_file))
@@ -1,28 +1,80 @@
 """
 Pattern Matching Module for Automated Inning Detection
 
-This module uses scipy.signal.correlate() to find all instances of the
+This module uses FFT-based cross-correlation to find all instances of the
 inning transition sound pattern throughout the full Mario Baseball video.
 """
 
+import sys
 import librosa
 import numpy as np
 import soundfile as sf
+from scipy import fft as sp_fft
 from scipy import signal
 from pathlib import Path
 import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+
+# The shared helpers live in the parent directory (the scripts there put
+# this one on sys.path the same way)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from _corr_utils import absmax, load_audio_cached, load_wav
+
+
+def _librosa_decode(file_path, sr, duration):
+    """Decoder for load_audio_cached: librosa.load as this module always used."""
+    if duration:
+        print(f"Loading first {duration/60:.1f} minutes...")
+    else:
+        print("Loading full audio file (this may take a few minutes)...")
+    audio_data, _ = librosa.load(file_path, sr=sr, duration=duration)
+    return audio_data
+
+
+def _minmax_envelope(values, max_points=100_000):
+    """
+    Split values into at most max_points equal buckets and return each
+    bucket's (start index, min, max). Plotted as a band, this shows every
+    peak of a multi-million-point signal at a fraction of the render cost.
+    """
+    step = max(1, -(-len(values) // max_points))  # ceil division
+    starts = np.arange(0, len(values), step)
+    return starts, np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)
 
 
 class InningPatternMatcher:
+    # Correlation outputs per overlap-save block; each FFT covers this many
+    # audio samples plus len(reference) - 1 of overlap
+    BLOCK_SIZE = 2**20
+    
+    # References shorter than this are correlated directly with np.correlate,
+    # which beats the FFT path for short kernels (crossover measured at
+    # ~600 samples against 2M-sample audio)
+    DIRECT_MAX_REF = 512
+    
+    # Seconds either side of a coarse candidate re-scored at full rate
+    REFINE_RADIUS = 0.5
+    
+    # Energy gating for the NCC search: power envelope hop (seconds), and
+    # lags per block that is either fully scored or skipped
+    ENERGY_HOP = 0.05
+    GATE_BLOCK_SIZE = 2**14
+    
     def __init__(self):
         """
         Initialize the pattern matcher.
         """
         self.reference_pattern = None
+        self.reference_pattern_normalized = None
         self.reference_sr = None
         self.audio_data = None
         self.audio_sr = None
         self.correlation_scores = None
+        self.correlation_sr = None
+        
+        # conj(rfft(...)) of reference-derived kernels, keyed on (kernel, FFT
+        # size); cleared whenever a new reference is loaded
+        self._ref_fft_cache = {}
         
     def load_reference_pattern(self, pattern_file="reference_sounds/inning_transition_average_pattern.wav"):
         """
@@ -37,7 +89,12 @@ class InningPatternMatcher:
         try:
             print(f"Loading reference pattern: {pattern_file}")
             
-            self.reference_pattern, self.reference_sr = librosa.load(pattern_file, sr=22050)
+            self.reference_sr = 22050
+            self.reference_pattern = load_wav(pattern_file, self.reference_sr)
+            self.reference_pattern_normalized = (
+                self.reference_pattern / np.max(np.abs(self.reference_pattern))
+            ).astype(np.float32, copy=False)
+            self._ref_fft_cache = {}
             
             print(f"[SUCCESS] Reference pattern loaded")
             print(f"  Duration: {len(self.reference_pattern)/self.reference_sr:.3f} seconds")
@@ -55,6 +112,10 @@ class InningPatternMatcher:
         """
         Load the full audio file for pattern matching.
         
+        The decoded 22050 Hz samples are kept in the shared .audio_cache/
+        (_corr_utils.load_audio_cached); later loads memory-map them instead
+        of decoding again.
+        
         Args:
             audio_file (str): Path to the audio file
             max_duration (float): Maximum duration to load (None for full file)
@@ -65,14 +126,8 @@ class InningPatternMatcher:
         try:
             print(f"Loading full audio: {audio_file}")
             
-            if max_duration:
-                print(f"Loading first {max_duration/60:.1f} minutes...")
-                self.audio_data, self.audio_sr = librosa.load(
-                    audio_file, sr=22050, duration=max_duration
-                )
-            else:
-                print("Loading full audio file (this may take a few minutes)...")
-                self.audio_data, self.audio_sr = librosa.load(audio_file, sr=22050)
+            self.audio_data = load_audio_cached(audio_file, 22050, duration=max_duration, decode=_librosa_decode)
+            self.audio_sr = 22050
             
             duration = len(self.audio_data) / self.audio_sr
             print(f"[SUCCESS] Audio loaded")
@@ -86,71 +141,318 @@ class InningPatternMatcher:
             print(f"Error loading audio: {str(e)}")
             return False
     
-    def find_pattern_matches(self, correlation_threshold=0.3, min_time_gap=30.0):
+    def find_pattern_matches(self, correlation_threshold=0.3, min_time_gap=30.0, method='correlation',
+                             decimation=8, energy_tolerance=None):
         """
         Find all instances of the reference pattern in the audio using correlation.
         
+        The search runs on audio and reference decimated by `decimation`, which
+        is plenty to locate a ~1 s jingle; each candidate is then re-scored at
+        full rate within REFINE_RADIUS seconds for a sample-accurate time.
+        
         Args:
             correlation_threshold (float): Minimum correlation score to consider a match
             min_time_gap (float): Minimum time gap between matches (seconds)
+            method (str): 'correlation' for correlation of the peak-normalized
+                signals (scores scale with the audio's loudness), or 'ncc' for
+                normalized cross-correlation against each audio window (scores
+                in [-1, 1], so one threshold works across videos)
+            decimation (int): Downsampling factor for the coarse search (1 to
+                search at full rate)
+            energy_tolerance (float): 'ncc' only - if given, skip (score 0)
+                stretches where no window's mean power is within this relative
+                tolerance of the reference's, e.g. 0.5 for +/-50%
             
         Returns:
-            list: List of (time, correlation_score) tuples for detected matches
+            tuple: (times, scores) arrays of detected match times (seconds) and
+                full-rate correlation scores, highest score first
         """
         if self.reference_pattern is None or self.audio_data is None:
             print("Error: Reference pattern and audio must be loaded first")
-            return []
+            return np.zeros(0), np.zeros(0, dtype=np.float32)
         
         print(f"\nSearching for inning transition patterns...")
         print(f"Correlation threshold: {correlation_threshold}")
         print(f"Minimum time gap: {min_time_gap} seconds")
         
-        # Normalize both signals to improve correlation accuracy
-        ref_normalized = self.reference_pattern / np.max(np.abs(self.reference_pattern))
-        audio_normalized = self.audio_data / np.max(np.abs(self.audio_data))
+        # Everything stays float32 (real float32 FFTs give complex64), halving
+        # the memory traffic of a float64 pipeline
+        ref_normalized = self.reference_pattern_normalized.astype(np.float32, copy=False)
+        self.audio_data = self.audio_data.astype(np.float32, copy=False)
+        audio_peak = np.max(np.abs(self.audio_data))
         
-        print("Computing cross-correlation (this may take a moment)...")
+        # Coarse search signals
+        coarse_threshold = correlation_threshold
+        if decimation > 1:
+            coarse_audio = signal.decimate(self.audio_data, decimation, ftype='fir').astype(np.float32)
+            coarse_ref = signal.decimate(ref_normalized, decimation, ftype='fir').astype(np.float32)
+            
+            # A perfect match's plain correlation score scales with the share
+            # of reference energy the anti-alias filter keeps; halve the
+            # candidate threshold again for margin - the real threshold is
+            # applied to the full-rate scores
+            if method != 'ncc':
+                coarse_threshold *= np.mean(np.square(coarse_ref)) / np.mean(np.square(ref_normalized))
+            coarse_threshold *= 0.5
+        else:
+            coarse_audio, coarse_ref = self.audio_data, ref_normalized
+        coarse_sr = self.audio_sr / decimation
         
-        # Compute cross-correlation using scipy
-        correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
+        print(f"Computing cross-correlation at {coarse_sr:,.0f} Hz (this may take a moment)...")
         
-        # Normalize correlation scores to 0-1 range
-        correlation = correlation / len(ref_normalized)
+        correlation = self._score_lags(coarse_audio, coarse_ref, method, audio_peak, decimation,
+                                       energy_tolerance=energy_tolerance)
         
+        max_correlation = np.max(correlation)
         print(f"Correlation computed: {len(correlation):,} values")
-        print(f"Max correlation: {np.max(correlation):.4f}")
+        print(f"Max correlation: {max_correlation:.4f}")
         print(f"Mean correlation: {np.mean(correlation):.4f}")
         
-        # Find peaks above threshold
+        # Store for analysis
+        self.correlation_scores = correlation
+        self.correlation_sr = coarse_sr
+        
+        # Nothing reaches even the candidate threshold: the pattern isn't there
+        if max_correlation < coarse_threshold:
+            print("Found 0 potential matches above threshold")
+            return np.zeros(0), np.zeros(0, dtype=np.float32)
+        
+        # Find candidate peaks above threshold; the prominence floor drops
+        # noise ripples that merely cross it
         peak_indices, properties = signal.find_peaks(
             correlation, 
-            height=correlation_threshold,
-            distance=int(min_time_gap * self.audio_sr)  # Convert time gap to samples
+            height=coarse_threshold,
+            distance=max(1, int(min_time_gap * coarse_sr)),  # Convert time gap to samples
+            prominence=max(coarse_threshold, 0) * 0.5 or None
         )
         
-        print(f"Found {len(peak_indices)} potential matches above threshold")
+        # Refine each candidate to a full-rate lag and score
+        if decimation > 1:
+            peak_lags, scores = self._refine_peaks(peak_indices * decimation, ref_normalized, method, audio_peak)
+            keep = scores >= correlation_threshold
+            peak_lags, scores = peak_lags[keep], scores[keep]
+        else:
+            peak_lags, scores = peak_indices, correlation[peak_indices]
         
-        # Convert peak indices to time and get correlation scores
-        matches = []
-        for idx in peak_indices:
-            time_seconds = idx / self.audio_sr
-            correlation_score = correlation[idx]
-            matches.append((time_seconds, correlation_score))
+        print(f"Found {len(peak_lags)} potential matches above threshold")
         
-        # Sort by correlation score (highest first)
-        matches.sort(key=lambda x: x[1], reverse=True)
+        # Convert peak lags to times, sorted by score (highest first)
+        times = peak_lags / self.audio_sr
+        order = np.argsort(-scores, kind='stable')
         
-        # Store for analysis
-        self.correlation_scores = correlation
+        return times[order], scores[order]
+    
+    def _refine_peaks(self, lags, ref, method, audio_peak):
+        """
+        Re-score full-rate lags within REFINE_RADIUS seconds of each coarse
+        candidate lag and return the best (lags, scores) around each.
+        """
+        ref_len = len(ref)
+        n_valid = len(self.audio_data) - ref_len + 1
+        radius = int(self.REFINE_RADIUS * self.audio_sr)
+        
+        best_lags = np.zeros(len(lags), dtype=np.intp)
+        best_scores = np.zeros(len(lags), dtype=np.float32)
+        for i, lag in enumerate(lags.tolist()):
+            start = max(0, lag - radius)
+            stop = min(n_valid, lag + radius + 1)
+            segment = self.audio_data[start:stop + ref_len - 1]
+            segment_scores = self._score_lags(segment, ref, method, audio_peak, 1, block_size=stop - start)
+            best = int(np.argmax(segment_scores))
+            best_lags[i] = start + best
+            best_scores[i] = segment_scores[best]
+        
+        return best_lags, best_scores
+    
+    def _score_lags(self, audio, ref, method, audio_peak, decimation, block_size=None,
+                    energy_tolerance=None):
+        """
+        Score ref against audio at every valid lag with the given method.
+        
+        Args:
+            audio (np.ndarray): Audio (possibly decimated)
+            ref (np.ndarray): Normalized reference at the same rate
+            method (str): 'correlation' or 'ncc' (see find_pattern_matches)
+            audio_peak (float): Peak amplitude of the full-rate audio
+            decimation (int): Rate the signals are decimated by, to keep the
+                reference spectra of different rates apart in the cache
+            block_size (int): Overlap-save block size (default BLOCK_SIZE)
+            energy_tolerance (float): Energy gate for 'ncc' (see find_pattern_matches)
+            
+        Returns:
+            np.ndarray: Score per valid lag
+        """
+        block_size = block_size or self.BLOCK_SIZE
+        
+        if method == 'ncc' and energy_tolerance is not None:
+            return self._gated_normalized_cross_correlation(audio, ref, decimation, energy_tolerance)
+        if method == 'ncc':
+            return self._normalized_cross_correlation(audio, ref, decimation, block_size)
+        
+        # Both signals are normalized to peak 1 and scores to the 0-1
+        # range. Correlation is linear, so the audio's scale and the
+        # 1/len(ref) score scale are folded into the reference spectrum:
+        # the audio is never rewritten and the scores need no extra pass
+        return self._correlate_overlap_save(
+            self._audio_blocks(audio, len(ref), block_size), ref, block_size,
+            kernel=('normalized', decimation), scale=1.0 / (audio_peak * len(ref))
+        )
+    
+    def _gated_normalized_cross_correlation(self, audio, ref, decimation, energy_tolerance):
+        """
+        _normalized_cross_correlation, computed only for the GATE_BLOCK_SIZE
+        blocks of lags that pass the energy gate; all other lags score 0.
+        """
+        ref_len = len(ref)
+        n_valid = len(audio) - ref_len + 1
+        block_size = self.GATE_BLOCK_SIZE
         
-        return matches
+        audio_peak = absmax(audio) if len(audio) else 0.0
+        if audio_peak == 0:
+            # Silent audio matches nothing (and would divide by zero below)
+            return np.zeros(max(0, n_valid), dtype=np.float32)
+        
+        # Mean power per ENERGY_HOP of the peak-normalized audio
+        hop = max(1, int(self.ENERGY_HOP * self.audio_sr / decimation))
+        hop_starts = np.arange(0, len(audio), hop)
+        hop_counts = np.diff(np.append(hop_starts, len(audio)))
+        hop_power = np.add.reduceat(np.square(audio, dtype=np.float64), hop_starts) / hop_counts
+        hop_power /= float(audio_peak) ** 2
+        
+        # Mean power of the window starting at each hop, over the hops it spans
+        window_hops = max(1, int(round(ref_len / hop)))
+        hop_cumsum = np.concatenate(([0.0], np.cumsum(hop_power)))
+        n_windows = max(0, len(hop_power) - window_hops + 1)
+        window_power = (hop_cumsum[window_hops:window_hops + n_windows] - hop_cumsum[:n_windows]) / window_hops
+        
+        ref_power = np.mean(np.square(ref, dtype=np.float64))
+        candidate_lags = np.flatnonzero(np.abs(window_power / ref_power - 1.0) <= energy_tolerance) * hop
+        candidate_lags = candidate_lags[candidate_lags < n_valid]
+        active_blocks = np.unique(candidate_lags // block_size)
+        
+        n_blocks = -(-n_valid // block_size)
+        print(f"Energy gate: scoring {len(active_blocks):,} of {n_blocks:,} blocks")
+        
+        scores = np.zeros(max(0, n_valid), dtype=np.float32)
+        for start in (active_blocks * block_size).tolist():
+            stop = min(start + block_size, n_valid)
+            scores[start:stop] = self._normalized_cross_correlation(
+                audio[start:stop + ref_len - 1], ref, decimation, block_size
+            )
+        
+        return scores
+    
+    def _normalized_cross_correlation(self, audio, ref, decimation, block_size):
+        """
+        Normalized cross-correlation of audio against ref at every valid lag:
+        sum(ref_zm * window) / (||ref_zm|| * ||window||), where ref_zm is the
+        zero-mean reference. By Cauchy-Schwarz the scores lie in [-1, 1].
+        
+        Args:
+            audio (np.ndarray): Audio
+            ref (np.ndarray): Reference pattern
+            decimation (int): Rate tag for the reference spectrum cache
+            block_size (int): Overlap-save block size
+            
+        Returns:
+            np.ndarray: NCC score per valid lag
+        """
+        ref_len = len(ref)
+        ref_zm = ref - ref.mean()
+        ref_norm = np.sqrt(np.dot(ref_zm, ref_zm))
+        
+        numerator = self._correlate_overlap_save(
+            self._audio_blocks(audio, ref_len, block_size), ref_zm, block_size,
+            kernel=('zero_mean', decimation)
+        )
+        
+        # Energy of every audio window in one O(N) pass: differences of a
+        # float64 prefix sum of the squared audio (exact enough that only
+        # truly silent windows come out as zero)
+        energy_cumsum = np.concatenate(([0.0], np.cumsum(np.square(audio, dtype=np.float64))))
+        window_energy = energy_cumsum[ref_len:] - energy_cumsum[:-ref_len]
+        
+        # Windows of silence have no shape to match, so score them 0
+        silent = window_energy <= 0.0
+        denominator = np.sqrt(window_energy, where=~silent, out=np.ones_like(window_energy))
+        denominator *= ref_norm
+        np.divide(numerator, denominator, out=numerator, casting='unsafe')
+        numerator[silent] = 0.0
+        
+        return numerator
+    
+    def _audio_blocks(self, audio, ref_len, block_size):
+        """
+        Yield the consecutive, ref_len - 1 overlapping blocks of audio
+        that _correlate_overlap_save expects.
+        """
+        n_valid = len(audio) - ref_len + 1
+        for start in range(0, n_valid, block_size):
+            yield audio[start:start + block_size + ref_len - 1]
+    
+    def _reference_fft(self, ref, n_fft, kernel=None):
+        """
+        conj(rfft(ref, n_fft)), cached per (kernel, n_fft) when a kernel name
+        is given, so repeated searches against the same reference skip it.
+        """
+        if kernel is None:
+            return np.conj(sp_fft.rfft(ref, n_fft, workers=-1))
+        
+        key = (kernel, n_fft)
+        if key not in self._ref_fft_cache:
+            self._ref_fft_cache[key] = np.conj(sp_fft.rfft(ref, n_fft, workers=-1))
+        return self._ref_fft_cache[key]
+    
+    def _correlate_overlap_save(self, blocks, ref, block_size, kernel=None, scale=None):
+        """
+        'valid' cross-correlation of audio against ref, by overlap-save.
+        
+        Args:
+            blocks (iterable): Consecutive float32 audio blocks of up to
+                block_size + len(ref) - 1 samples, each overlapping the previous
+                one by len(ref) - 1 samples (as soundfile.blocks(overlap=...) yields)
+            ref (np.ndarray): Reference pattern
+            block_size (int): Valid lags per full block
+            kernel: Key to cache ref's spectrum under (see _reference_fft)
+            scale (float): Optional factor to multiply the correlation by
+            
+        Returns:
+            np.ndarray: Correlation, one value per valid lag
+        """
+        ref_len = len(ref)
+        
+        if ref_len < self.DIRECT_MAX_REF:
+            pieces = [np.correlate(block, ref, mode='valid') for block in blocks if len(block) >= ref_len]
+            correlation = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.float32)
+            if scale is not None:
+                correlation *= np.float32(scale)
+            return correlation
+        
+        n_fft = sp_fft.next_fast_len(block_size + ref_len - 1, real=True)
+        ref_fft = self._reference_fft(ref, n_fft, kernel)
+        if scale is not None:
+            # Scaled copy, leaving the cached spectrum untouched
+            ref_fft = ref_fft * np.float32(scale)
+        
+        pieces = []
+        for block in blocks:
+            if len(block) < ref_len:
+                break
+            # Circular wrap-around only reaches lags past the block's valid ones
+            block_fft = sp_fft.rfft(block, n_fft, workers=-1)
+            block_fft *= ref_fft
+            pieces.append(sp_fft.irfft(block_fft, n_fft, workers=-1)[:len(block) - ref_len + 1])
+        
+        if not pieces:
+            return np.zeros(0, dtype=np.float32)
+        return np.concatenate(pieces)
     
     def analyze_matches(self, matches, known_times=[148, 243, 454]):
         """
         Analyze the detected matches against known inning transition times.
         
         Args:
-            matches (list): List of (time, score) tuples from find_pattern_matches
+            matches (tuple): (times, scores) arrays from find_pattern_matches
             known_times (list): Known inning transition times in seconds for validation
             
         Returns:
@@ -160,15 +462,22 @@ class InningPatternMatcher:
         print("PATTERN MATCHING ANALYSIS")
         print(f"{'='*60}")
         
-        if not matches:
+        times, scores = matches
+        if len(times) == 0:
             print("No matches found!")
             return {"accuracy": 0, "precision": 0, "recall": 0}
         
-        print(f"Total matches found: {len(matches)}")
+        print(f"Total matches found: {len(times)}")
         print(f"Known inning transitions: {len(known_times)}")
         
+        # Ten best matches: partial selection, then sort just those
+        top = np.arange(len(scores))
+        if len(scores) > 10:
+            top = np.argpartition(-scores, 10)[:10]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        
         print(f"\nTOP MATCHES:")
-        for i, (time, score) in enumerate(matches[:10]):
+        for i, (time, score) in enumerate(zip(times[top].tolist(), scores[top].tolist())):
             minutes = int(time // 60)
             seconds = int(time % 60)
             print(f"  {i+1}: {minutes:2d}:{seconds:02d} ({time:6.1f}s) - Score: {score:.4f}")
@@ -180,19 +489,18 @@ class InningPatternMatcher:
         
         print(f"\nVALIDATION AGAINST KNOWN TIMES (±{tolerance}s tolerance):")
         
-        for known_time in known_times:
+        # Best-scoring match within tolerance of each known time (-1 if none),
+        # from one (known x matches) distance matrix
+        known = np.asarray(known_times, dtype=float)
+        within = np.abs(times[None, :] - known[:, None]) <= tolerance
+        best_idx = np.where(within.any(axis=1), np.where(within, scores, -np.inf).argmax(axis=1), -1)
+        
+        for known_time, best in zip(known_times, best_idx.tolist()):
             known_minutes = int(known_time // 60)
             known_seconds = int(known_time % 60)
             
-            # Find if any match is close to this known time
-            close_matches = [
-                (time, score) for time, score in matches 
-                if abs(time - known_time) <= tolerance
-            ]
-            
-            if close_matches:
-                best_match = max(close_matches, key=lambda x: x[1])
-                match_time, match_score = best_match
+            if best >= 0:
+                match_time, match_score = times[best], scores[best]
                 match_minutes = int(match_time // 60)
                 match_seconds = int(match_time % 60)
                 error = abs(match_time - known_time)
@@ -204,20 +512,20 @@ class InningPatternMatcher:
                 print(f"  Known: {known_minutes:2d}:{known_seconds:02d} -> NOT DETECTED ✗")
         
         # Calculate metrics
-        precision = true_positives / len(matches) if matches else 0
+        precision = true_positives / len(times)
         recall = true_positives / len(known_times) if known_times else 0
         accuracy = true_positives / len(known_times) if known_times else 0
         
         print(f"\nPERFORMANCE METRICS:")
         print(f"  True Positives: {true_positives}")
-        print(f"  Total Detected: {len(matches)}")
+        print(f"  Total Detected: {len(times)}")
         print(f"  Total Known: {len(known_times)}")
         print(f"  Accuracy: {accuracy:.2%} ({true_positives}/{len(known_times)} known transitions detected)")
-        print(f"  Precision: {precision:.2%} ({true_positives}/{len(matches)} detections were correct)")
+        print(f"  Precision: {precision:.2%} ({true_positives}/{len(times)} detections were correct)")
         print(f"  Recall: {recall:.2%} (same as accuracy for this case)")
         
         return {
-            "total_matches": len(matches),
+            "total_matches": len(times),
             "true_positives": true_positives,
             "accuracy": accuracy,
             "precision": precision,
@@ -234,53 +542,57 @@ class InningPatternMatcher:
             return
         
         try:
-            # Create time axis for correlation
-            time_axis = np.arange(len(self.correlation_scores)) / self.audio_sr
-            
             plt.figure(figsize=(15, 8))
             
-            # Plot correlation scores
+            # Both panels are drawn against lag index (no seconds array for
+            # the whole signal); ticks are relabelled in seconds
+            sr = self.correlation_sr
+            seconds = FuncFormatter(lambda x, pos: f"{x / sr:.0f}")
+            
+            # Plot correlation scores as a min/max band (drawing every one of
+            # millions of line segments would stall the renderer)
             plt.subplot(2, 1, 1)
-            plt.plot(time_axis, self.correlation_scores, alpha=0.7, color='blue', linewidth=0.5)
+            starts, lows, highs = _minmax_envelope(self.correlation_scores)
+            plt.fill_between(starts, lows, highs, alpha=0.7, color='blue', linewidth=0.5)
+            plt.gca().xaxis.set_major_formatter(seconds)
             plt.title('Cross-Correlation Scores Over Time')
             plt.xlabel('Time (seconds)')
             plt.ylabel('Correlation Score')
             plt.grid(True, alpha=0.3)
             
             # Mark detected matches
-            match_times = [time for time, score in matches]
-            match_scores = [score for time, score in matches]
-            plt.scatter(match_times, match_scores, color='red', s=100, alpha=0.8, 
-                       label=f'Detected Matches ({len(matches)})', zorder=5)
+            match_times, match_scores = matches
+            plt.scatter(match_times * sr, match_scores, color='red', s=100, alpha=0.8, 
+                       label=f'Detected Matches ({len(match_times)})', zorder=5)
             
             # Mark known times
             for known_time in known_times:
-                plt.axvline(x=known_time, color='green', linestyle='--', alpha=0.7, linewidth=2)
+                plt.axvline(x=known_time * sr, color='green', linestyle='--', alpha=0.7, linewidth=2)
             
             plt.legend()
             
             # Plot zoomed view of first 10 minutes
             plt.subplot(2, 1, 2)
-            zoom_end = min(600, len(time_axis))  # First 10 minutes or end of audio
-            plt.plot(time_axis[:zoom_end], self.correlation_scores[:zoom_end], 
+            zoom_end = min(int(600 * sr), len(self.correlation_scores))  # First 10 minutes or end of audio
+            starts, lows, highs = _minmax_envelope(self.correlation_scores[:zoom_end])
+            plt.fill_between(starts, lows, highs, 
                     alpha=0.7, color='blue', linewidth=1)
+            plt.gca().xaxis.set_major_formatter(seconds)
             plt.title('Cross-Correlation Scores - First 10 Minutes (Zoomed)')
             plt.xlabel('Time (seconds)')
             plt.ylabel('Correlation Score')
             plt.grid(True, alpha=0.3)
             
             # Mark matches in zoom view
-            zoom_matches = [(t, s) for t, s in matches if t <= 600]
-            if zoom_matches:
-                zoom_match_times = [time for time, score in zoom_matches]
-                zoom_match_scores = [score for time, score in zoom_matches]
-                plt.scatter(zoom_match_times, zoom_match_scores, color='red', s=100, 
+            in_zoom = match_times <= 600
+            if in_zoom.any():
+                plt.scatter(match_times[in_zoom] * sr, match_scores[in_zoom], color='red', s=100, 
                            alpha=0.8, zorder=5)
             
             # Mark known times in zoom view
             for known_time in known_times:
                 if known_time <= 600:
-                    plt.axvline(x=known_time, color='green', linestyle='--', alpha=0.7, linewidth=2)
+                    plt.axvline(x=known_time * sr, color='green', linestyle='--', alpha=0.7, linewidth=2)
             
             plt.tight_layout()
             
@@ -2,10 +2,23 @@
 Create focused audio clips around the exact inning transition timing.
 """
 
-import librosa
 import soundfile as sf
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from _corr_utils import load_wav
+
+def _filter_and_save(clip, sr, filter_configs, output_files):
+    """
+    Apply every filter configuration to a clip and save the results. Runs in
+    a worker process, so it builds its own AudioFilter; the configs share one
+    STFT of the clip.
+    """
+    from audio_filtering import AudioFilter
+    filtered_clips = AudioFilter().apply_combined_filter_batch(clip, filter_configs)
+    for filtered_audio, output_file in zip(filtered_clips, output_files):
+        sf.write(output_file, filtered_audio, sr)
+    return output_files
 
 class FocusedClipCreator:
     def __init__(self):
@@ -45,68 +58,76 @@ class FocusedClipCreator:
         output_dir = Path("focused_clips")
         output_dir.mkdir(exist_ok=True)
         
-        for video in video_files:
-            print(f"\n{video['name']}:")
-            print("-" * 25)
+        # The filter runs are independent and CPU-bound, so each clip's batch
+        # of configs goes to a process pool; results are collected below
+        with ProcessPoolExecutor() as executor:
+            pending = []
             
-            try:
-                # Load full audio file
-                audio_data, sr = filter_system.load_audio(video['path'])
-                
-                # Calculate clip boundaries
-                center_time = video['full_video_transition_time']
-                start_time = center_time - before_transition
-                end_time = center_time + before_transition
-                
-                start_sample = int(start_time * sr)
-                end_sample = int(end_time * sr)
-                
-                # Extract focused clip
-                focused_clip = audio_data[start_sample:end_sample]
+            for video in video_files:
+                print(f"\n{video['name']}:")
+                print("-" * 25)
                 
-                print(f"Extracting {clip_duration}s clip centered at {center_time}s")
-                print(f"Clip range: {start_time:.1f}s to {end_time:.1f}s")
-                print(f"Clip length: {len(focused_clip)/sr:.1f} seconds")
-                
-                # Save original focused clip
-                video_name = video['name'].lower().replace(' ', '_')
-                original_file = output_dir / f"{video_name}_focused_original.wav"
-                sf.write(str(original_file), focused_clip, sr)
-                print(f"[SAVED] {original_file}")
-                
-                # Apply different filtering approaches to focused clip
-                filter_configs = [
-                    {"name": "frequency_only", "config": {"spectral_subtraction": False, "frequency_band": True, "compression": False, "noise_gate": False}},
-                    {"name": "spectral_only", "config": {"spectral_subtraction": True, "frequency_band": False, "compression": False, "noise_gate": False}},
-                    {"name": "combined_light", "config": {"spectral_subtraction": True, "frequency_band": True, "compression": False, "noise_gate": False}},
-                    {"name": "combined_full", "config": {"spectral_subtraction": True, "frequency_band": True, "compression": True, "noise_gate": True}},
-                ]
-                
-                for filter_set in filter_configs:
-                    print(f"  Applying: {filter_set['name']}")
+                try:
+                    # Load full audio file
+                    audio_data, sr = filter_system.load_audio(video['path'])
+                    
+                    # Calculate clip boundaries
+                    center_time = video['full_video_transition_time']
+                    start_time = center_time - before_transition
+                    end_time = center_time + before_transition
                     
-                    filtered_audio = filter_system.apply_combined_filter(
-                        focused_clip, 
-                        filter_set['config']
+                    start_sample = int(start_time * sr)
+                    end_sample = int(end_time * sr)
+                    
+                    # Extract focused clip
+                    focused_clip = audio_data[start_sample:end_sample]
+                    
+                    print(f"Extracting {clip_duration}s clip centered at {center_time}s")
+                    print(f"Clip range: {start_time:.1f}s to {end_time:.1f}s")
+                    print(f"Clip length: {len(focused_clip)/sr:.1f} seconds")
+                    
+                    # Save original focused clip
+                    video_name = video['name'].lower().replace(' ', '_')
+                    original_file = output_dir / f"{video_name}_focused_original.wav"
+                    sf.write(str(original_file), focused_clip, sr)
+                    print(f"[SAVED] {original_file}")
+                    
+                    # Apply different filtering approaches to focused clip
+                    filter_configs = [
+                        {"name": "frequency_only", "config": {"spectral_subtraction": False, "frequency_band": True, "compression": False, "noise_gate": False}},
+                        {"name": "spectral_only", "config": {"spectral_subtraction": True, "frequency_band": False, "compression": False, "noise_gate": False}},
+                        {"name": "combined_light", "config": {"spectral_subtraction": True, "frequency_band": True, "compression": False, "noise_gate": False}},
+                        {"name": "combined_full", "config": {"spectral_subtraction": True, "frequency_band": True, "compression": True, "noise_gate": True}},
+                    ]
+                    
+                    print(f"  Queued: {', '.join(f['name'] for f in filter_configs)}")
+                    
+                    # Filter and save in a worker process
+                    filtered_files = [str(output_dir / f"{video_name}_focused_{f['name']}.wav") for f in filter_configs]
+                    future = executor.submit(
+                        _filter_and_save, focused_clip, sr, [f['config'] for f in filter_configs], filtered_files
                     )
+                    pending.append((video['name'], future))
                     
-                    # Save filtered version
-                    filtered_file = output_dir / f"{video_name}_focused_{filter_set['name']}.wav"
-                    sf.write(str(filtered_file), filtered_audio, sr)
-                    print(f"  [SAVED] {filtered_file}")
-                
-            except Exception as e:
-                print(f"  [ERROR] Failed to process {video['name']}: {e}")
+                except Exception as e:
+                    print(f"  [ERROR] Failed to process {video['name']}: {e}")
+            
+            # Wait for the filtered clips
+            print(f"\nFiltering {len(pending)} clips in parallel...")
+            for video_name, future in pending:
+                try:
+                    for filtered_file in future.result():
+                        print(f"  [SAVED] {filtered_file}")
+                except Exception as e:
+                    print(f"  [ERROR] {video_name}: {e}")
         
         # Also create a clip of our official reference for comparison
         print(f"\nOfficial Reference:")
         print("-" * 20)
         
         try:
-            reference_audio, ref_sr = librosa.load(
-                "reference_sounds/official_inning_transition_pattern.wav", 
-                sr=22050
-            )
+            ref_sr = 22050
+            reference_audio = load_wav("reference_sounds/official_inning_transition_pattern.wav", ref_sr)
             
             # Save official reference in focused clips folder for easy comparison
             ref_file = output_dir / "official_next_inning_reference.wav"
@@ -7,6 +7,7 @@ import librosa
 import soundfile as sf
 import numpy as np
 from pathlib import Path
+from _corr_utils import load_wav
 
 def create_reference_playback():
     """
@@ -25,7 +26,8 @@ def create_reference_playback():
     print("\n1. Current Reference Pattern:")
     try:
         pattern_file = "reference_sounds/refined_inning_transition_pattern.wav"
-        reference_pattern, ref_sr = librosa.load(pattern_file, sr=22050)
+        ref_sr = 22050
+        reference_pattern = load_wav(pattern_file, ref_sr)
         
         # Save at higher sample rate for better playability
         output_file = output_dir / "current_reference_pattern.wav"
@@ -53,7 +55,7 @@ def create_reference_playback():
         try:
             source_file = Path("reference_sounds") / example["file"]
             if source_file.exists():
-                audio_data, sr = librosa.load(str(source_file), sr=22050)
+                audio_data = load_wav(str(source_file), 22050)
                 
                 output_file = output_dir / f"original_example_{i+1}_{example['file']}"
                 sf.write(str(output_file), audio_data, 22050)
@@ -81,18 +83,23 @@ def create_reference_playback():
             # Extract audio from the timestamps we detected (but were wrong)
             suspect_times = [35, 255, 423]  # 0:35, 4:15, 7:03 in seconds
             
+            # Decode the video once, up to the end of the last window, and
+            # slice every window out of it
+            clip_duration = 4.0
+            full_audio, sr = librosa.load(
+                new_video_file,
+                sr=22050,
+                duration=max(0, max(suspect_times) - 1) + clip_duration
+            )
+            
             for i, time_sec in enumerate(suspect_times):
                 mm = time_sec // 60
                 ss = time_sec % 60
                 
                 try:
-                    # Load 4-second window around the time
-                    audio_segment, sr = librosa.load(
-                        new_video_file,
-                        sr=22050,
-                        offset=max(0, time_sec - 1),
-                        duration=4.0
-                    )
+                    # 4-second window around the time
+                    start = int(max(0, time_sec - 1) * sr)
+                    audio_segment = full_audio[start:start + int(clip_duration * sr)]
                     
                     output_file = output_dir / f"new_video_suspect_{i+1}_{mm:02d}-{ss:02d}.wav"
                     sf.write(str(output_file), audio_segment, 22050)
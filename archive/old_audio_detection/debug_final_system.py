@@ -86,11 +86,11 @@ def debug_correlation_comparison():
             
             for segment_name, test_segment in test_segments.items():
                 # Normalize both
-                ref_norm = ref_pattern / np.max(np.abs(ref_pattern))
-                seg_norm = test_segment / np.max(np.abs(test_segment))
+                ref_norm = (ref_pattern / np.max(np.abs(ref_pattern))).astype(np.float32, copy=False)
+                seg_norm = (test_segment / np.max(np.abs(test_segment))).astype(np.float32, copy=False)
                 
                 # Cross-correlation
-                correlation = signal.correlate(seg_norm, ref_norm, mode='valid')
+                correlation = signal.correlate(seg_norm, ref_norm, mode='valid', method='fft')
                 max_corr = np.max(correlation) / len(ref_norm)
                 
                 print(f"  vs {segment_name:<20}: {max_corr:.6f}")
@@ -145,9 +145,9 @@ def test_correlation_thresholds():
     filtered_audio = filter_system.apply_combined_filter(audio_data, filter_config)
     
     # Compute correlation
-    ref_norm = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_norm = filtered_audio / np.max(np.abs(filtered_audio))
-    correlation = signal.correlate(audio_norm, ref_norm, mode='valid')
+    ref_norm = (reference_pattern / np.max(np.abs(reference_pattern))).astype(np.float32, copy=False)
+    audio_norm = (filtered_audio / np.max(np.abs(filtered_audio))).astype(np.float32, copy=False)
+    correlation = signal.correlate(audio_norm, ref_norm, mode='valid', method='fft')
     correlation = correlation / len(ref_norm)
     
     # Test different thresholds
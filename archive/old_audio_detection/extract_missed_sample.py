@@ -2,9 +2,9 @@
 Extract audio sample from the missed 18:39 transition for manual Audacity editing.
 """
 
-import librosa
 import soundfile as sf
 from pathlib import Path
+from _corr_utils import load_audio_ffmpeg
 
 def extract_18_39_sample():
     """
@@ -30,6 +30,14 @@ def extract_18_39_sample():
             {"duration": 3, "offset": 1.5, "desc": "3sec_tight"}
         ]
         
+        # Decode only the span covering every window, once: ffmpeg seeks to
+        # its start instead of decoding the 18 minutes before it, and each
+        # window is then sliced out of that span
+        sr = 22050
+        span_start = min(max(0, target_time - w["offset"]) for w in windows)
+        span_end = max(max(0, target_time - w["offset"]) + w["duration"] for w in windows)
+        span_audio = load_audio_ffmpeg(audio_file, sr, offset=span_start, duration=span_end - span_start)
+        
         for window in windows:
             duration = window["duration"]
             offset = window["offset"]
@@ -37,12 +45,8 @@ def extract_18_39_sample():
             
             start_time = max(0, target_time - offset)
             
-            audio_segment, sr = librosa.load(
-                audio_file,
-                sr=22050,
-                offset=start_time,
-                duration=duration
-            )
+            start_sample = int((start_time - span_start) * sr)
+            audio_segment = span_audio[start_sample:start_sample + int(duration * sr)]
             
             filename = f"sample_18m39s_{desc}.wav"
             output_path = output_dir / filename
@@ -77,10 +77,10 @@ class FinalInningDetector:
         # Normalize both signals for correlation
         print("Computing cross-correlation with official pattern...")
         ref_normalized = self.reference_pattern / np.max(np.abs(self.reference_pattern))
-        audio_normalized = filtered_audio / np.max(np.abs(filtered_audio))
+        audio_normalized = (filtered_audio / np.max(np.abs(filtered_audio))).astype(np.float32, copy=False)
         
         # Cross-correlation
-        correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
+        correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid', method='fft')
         correlation = correlation / len(ref_normalized)
         
         print(f"Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
@@ -5,19 +5,34 @@ Uses multiple clean chime samples to create a robust detection system.
 Combines user-extracted samples with official audio for best results.
 """
 
-import librosa
+import math
+import os
 import numpy as np
+from scipy import fft as sp_fft
 from scipy import signal
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from audio_filtering import AudioFilter
+from _corr_utils import load_audio_cached, load_wav, pick_peaks
 import soundfile as sf
 
 class MultiTemplateDetector:
     def __init__(self):
         self.sample_rate = 22050
+        
+        # Correlation runs at half the load rate: the chimes sit below
+        # ~5 kHz, so after band filtering the audio is decimated by 2 and the
+        # templates are loaded at this rate, halving FFT sizes and buffers
+        self.correlation_sr = 11025
+        
         self.audio_filter = AudioFilter()
         self.chime_templates = []
         self.template_names = []
+        self.template_norms = []
+        
+        # Conjugated template spectra, keyed on FFT size; templates don't
+        # change after loading, so each size is computed once per detector
+        self._template_ffts = {}
         
     def load_chime_templates(self):
         """
@@ -40,13 +55,17 @@ class MultiTemplateDetector:
         
         for file_path, name in template_files:
             try:
-                audio, sr = librosa.load(file_path, sr=self.sample_rate)
+                audio = load_wav(file_path, self.correlation_sr)
+                sr = self.correlation_sr
                 
-                # Normalize template
-                audio_normalized = audio / np.max(np.abs(audio))
+                # Normalize template, kept in float32 so its FFTs (and the
+                # correlations against it) run in single precision
+                audio_normalized = (audio / np.max(np.abs(audio))).astype(np.float32, copy=False)
                 
                 self.chime_templates.append(audio_normalized)
                 self.template_names.append(name)
+                self.template_norms.append(np.linalg.norm(audio_normalized))
+                self._template_ffts.clear()
                 
                 duration = len(audio) / sr
                 rms = np.sqrt(np.mean(audio**2))
@@ -60,6 +79,19 @@ class MultiTemplateDetector:
         print(f"\nLoaded {templates_loaded} chime templates successfully")
         return templates_loaded > 0
     
+    def _template_spectra(self, nfft):
+        """
+        conj(rfft(template, nfft)) for every loaded template, cached per nfft.
+        """
+        spectra = self._template_ffts.get(nfft)
+        if spectra is None:
+            spectra = [
+                np.conj(sp_fft.rfft(template, nfft, workers=-1))
+                for template in self.chime_templates
+            ]
+            self._template_ffts[nfft] = spectra
+        return spectra
+    
     def analyze_template_characteristics(self):
         """
         Analyze the characteristics of all loaded templates.
@@ -75,7 +107,7 @@ class MultiTemplateDetector:
         rms_values = []
         
         for i, (template, name) in enumerate(zip(self.chime_templates, self.template_names)):
-            duration = len(template) / self.sample_rate
+            duration = len(template) / self.correlation_sr
             rms = np.sqrt(np.mean(template**2))
             
             durations.append(duration)
@@ -100,11 +132,13 @@ class MultiTemplateDetector:
         # Load video audio
         try:
             print("Loading video audio...")
+            # Decoded once, then memory-mapped from the on-disk cache on reruns
+            sr = self.sample_rate
             if max_duration:
-                audio_data, sr = librosa.load(video_file, sr=self.sample_rate, duration=max_duration)
+                audio_data = load_audio_cached(video_file, sr, duration=max_duration)
                 print(f"Loaded: {max_duration/60:.1f} minutes")
             else:
-                audio_data, sr = librosa.load(video_file, sr=self.sample_rate)
+                audio_data = load_audio_cached(video_file, sr)
                 duration_minutes = len(audio_data) / sr / 60
                 print(f"Loaded: {duration_minutes:.1f} minutes")
             
@@ -115,56 +149,114 @@ class MultiTemplateDetector:
         # Apply frequency filtering
         print("Applying frequency band filtering...")
         filtered_audio = self.audio_filter.frequency_band_filter(audio_data)
-        audio_normalized = filtered_audio / np.max(np.abs(filtered_audio))
         
-        # Test each template
+        # Down to the correlation rate (resample_poly's anti-alias FIR cuts
+        # the band above the new Nyquist)
+        g = math.gcd(self.correlation_sr, sr)
+        filtered_audio = signal.resample_poly(filtered_audio, self.correlation_sr // g, sr // g)
+        sr = self.correlation_sr
+        
+        # resample_poly returns float64; drop back to float32 before
+        # normalizing so every full-length pass after this moves half the bytes
+        audio_normalized = filtered_audio.astype(np.float32)
+        audio_normalized /= np.max(np.abs(audio_normalized))
+        
+        # FFT the audio once; every template's correlation reuses it. With
+        # nfft >= len(audio) the circular correlation has no wrap-around at
+        # the 'valid' lags.
+        nfft = sp_fft.next_fast_len(len(audio_normalized), real=True)
+        audio_fft = sp_fft.rfft(audio_normalized, nfft, workers=-1)
+        template_ffts = self._template_spectra(nfft)
+        
+        # Running sum of squares (float64, so differences of large sums stay
+        # accurate) gives every window's energy for the NCC denominator
+        energy_cumsum = np.concatenate(([0.0], np.cumsum(np.square(audio_normalized, dtype=np.float64))))
+        
+        # Test each template. The templates are independent and the FFT work
+        # releases the GIL, so they run on a thread pool (each single-threaded
+        # inside scipy.fft to avoid oversubscription); results print in order
         all_detections = {}
         correlation_stats = {}
         
         print(f"\nTesting {len(self.chime_templates)} templates:")
         
-        for i, (template, name) in enumerate(zip(self.chime_templates, self.template_names)):
+        n_workers = min(len(self.chime_templates), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(
+                lambda i: self._score_template(i, audio_fft, template_ffts[i], nfft,
+                                               energy_cumsum, len(audio_normalized), sr),
+                range(len(self.chime_templates))
+            ))
+        
+        for i, (name, (detections, stats, threshold)) in enumerate(zip(self.template_names, results)):
             print(f"\n{i+1}. {name}:")
+            print(f"   Correlation range: {stats['min']:.6f} to {stats['max']:.6f}")
+            print(f"   Mean: {stats['mean']:.6f}, Std: {stats['std']:.6f}")
             
-            # Cross-correlation
-            correlation = signal.correlate(audio_normalized, template, mode='valid')
-            correlation = correlation / len(template)
-            
-            # Statistics
-            corr_min, corr_max = np.min(correlation), np.max(correlation)
-            corr_mean, corr_std = np.mean(correlation), np.std(correlation)
-            
-            print(f"   Correlation range: {corr_min:.6f} to {corr_max:.6f}")
-            print(f"   Mean: {corr_mean:.6f}, Std: {corr_std:.6f}")
-            
-            correlation_stats[name] = {
-                'min': corr_min, 'max': corr_max, 
-                'mean': corr_mean, 'std': corr_std,
-                'correlation': correlation
-            }
-            
-            # Find peaks with conservative threshold
-            threshold = np.percentile(correlation, 99.7)  # Very conservative
-            min_gap_samples = int(60 * sr)  # 1 minute minimum
-            
-            peak_indices, _ = signal.find_peaks(
-                correlation, 
-                height=threshold, 
-                distance=min_gap_samples
-            )
-            
-            # Convert to detections
-            detections = []
-            for idx in peak_indices:
-                time_sec = idx / sr
-                score = correlation[idx]
-                detections.append((time_sec, score))
-            
+            correlation_stats[name] = stats
             all_detections[name] = detections
             print(f"   Found {len(detections)} detections with threshold {threshold:.6f}")
         
         return all_detections, correlation_stats
     
+    def _score_template(self, i, audio_fft, template_fft, nfft, energy_cumsum, n_audio, sr):
+        """
+        Correlate template i against the audio spectrum and pick its peaks.
+        
+        Returns:
+            (detections, stats, threshold) - detections as (time_sec, score)
+        """
+        # Normalized cross-correlation in [-1, 1]: 'valid' lags of
+        # irfft(A * conj(T)), divided by the template norm and each audio
+        # window's norm so scores are comparable across templates
+        template_len = len(self.chime_templates[i])
+        valid_len = n_audio - template_len + 1
+        correlation = sp_fft.irfft(audio_fft * template_fft, nfft, workers=1)[:valid_len]
+        window_norms = np.sqrt(np.maximum(
+            energy_cumsum[template_len:] - energy_cumsum[:valid_len], 0.0
+        ))
+        denominator = (window_norms * self.template_norms[i]).astype(np.float32)
+        # Silent windows can't match anything; score them 0
+        np.divide(correlation, denominator, out=correlation, where=denominator > 1e-6)
+        correlation[denominator <= 1e-6] = 0.0
+        
+        # Conservative peak threshold (the 99.7th percentile) plus min and
+        # max all come from one partition: the order statistics at both
+        # ends and around the percentile rank, interpolated as np.percentile
+        # does
+        n = len(correlation)
+        rank = 0.997 * (n - 1)  # Very conservative
+        lo, hi = int(math.floor(rank)), int(math.ceil(rank))
+        ordered = np.partition(correlation, [0, lo, hi, n - 1])
+        threshold = ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+        corr_min, corr_max = ordered[0], ordered[n - 1]
+        del ordered
+        
+        # A 1-second max envelope (sr times fewer points) stands in for the
+        # full correlation in the stats, e.g. for plotting
+        block = int(sr)
+        envelope = np.maximum.reduceat(correlation, np.arange(0, len(correlation), block))
+        
+        stats = {
+            'min': corr_min, 'max': corr_max, 
+            'mean': np.mean(correlation), 'std': np.std(correlation),
+            'envelope': envelope
+        }
+        
+        # Peaks at least a minute apart in samples. pick_peaks only visits
+        # the samples above the threshold (0.3% of them at the 99.7th
+        # percentile), so this stays cheap at full rate
+        peak_indices = pick_peaks(correlation, threshold, 60 * block)  # 1 minute minimum
+        
+        # Convert to detections
+        detections = []
+        for idx in peak_indices:
+            time_sec = idx / sr
+            score = correlation[idx]
+            detections.append((time_sec, score))
+        
+        return detections, stats, threshold
+    
     def combine_template_results(self, all_detections, tolerance=5.0):
         """
         Combine results from multiple templates using consensus voting.
@@ -172,43 +264,42 @@ class MultiTemplateDetector:
         print(f"\nCOMBINING TEMPLATE RESULTS")
         print("-" * 40)
         
-        # Collect all unique detection times
-        all_times = []
+        # Collect all detections as flat arrays, ordered by time (stable, so
+        # ties keep template order)
+        times, scores, names = [], [], []
         for template_name, detections in all_detections.items():
             for time_sec, score in detections:
-                all_times.append((time_sec, template_name, score))
+                times.append(time_sec)
+                scores.append(score)
+                names.append(template_name)
         
-        # Sort by time
-        all_times.sort(key=lambda x: x[0])
+        times = np.asarray(times, dtype=np.float64)
+        scores = np.asarray(scores, dtype=np.float64)
+        order = np.argsort(times, kind='stable')
+        sorted_times = times[order]
         
-        # Group nearby detections (within tolerance)
+        # Group nearby detections: each group runs from its first detection to
+        # the last one within tolerance of it. Where that window ends is
+        # found for every detection in one vectorized binary search; the
+        # loop below only hops from one group start to the next
+        group_ends = np.searchsorted(sorted_times, sorted_times + tolerance, side='right').tolist()
         consensus_detections = []
         i = 0
         
-        while i < len(all_times):
-            current_time, current_template, current_score = all_times[i]
-            
-            # Find all detections within tolerance of current time
-            group = [(current_time, current_template, current_score)]
-            j = i + 1
-            
-            while j < len(all_times):
-                next_time, next_template, next_score = all_times[j]
-                if abs(next_time - current_time) <= tolerance:
-                    group.append((next_time, next_template, next_score))
-                    j += 1
-                else:
-                    break
+        while i < len(order):
+            j = group_ends[i]
+            group = order[i:j]
             
             # If multiple templates agree, this is a strong detection
             if len(group) >= 2:  # At least 2 templates must agree
                 # Use the detection with highest score as representative
-                best_detection = max(group, key=lambda x: x[2])
-                consensus_time, _, consensus_score = best_detection
+                best = group[np.argmax(scores[group])]
+                consensus_time = float(times[best])
+                consensus_score = scores[best]
                 
                 # Calculate consensus strength (how many templates agreed)
                 consensus_strength = len(group)
-                template_names = [t[1] for t in group]
+                template_names = [names[k] for k in group]
                 
                 consensus_detections.append({
                     'time': consensus_time,
@@ -222,7 +313,7 @@ class MultiTemplateDetector:
                       f"Strength: {consensus_strength}/{len(self.chime_templates)} - "
                       f"Score: {consensus_score:.6f}")
             
-            i = j if j > i + 1 else i + 1
+            i = j
         
         print(f"\nFound {len(consensus_detections)} consensus detections")
         
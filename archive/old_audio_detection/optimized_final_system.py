@@ -5,11 +5,15 @@ Based on debug analysis showing old refined pattern + frequency filtering
 achieves much better correlation than official audio (0.011661 vs 0.000606).
 """
 
-import librosa
+import contextlib
+import io
+import math
+import os
 import numpy as np
-from scipy import signal
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from audio_filtering import AudioFilter
+from _corr_utils import PatternMatcher, absmax, load_audio_cached, load_audio_ffmpeg, pick_peaks
 
 class OptimizedInningDetector:
     def __init__(self):
@@ -17,9 +21,12 @@ class OptimizedInningDetector:
         Initialize the optimized inning detection system.
         """
         self.sample_rate = 22050
+        self.min_gap_samples = int(90 * self.sample_rate)  # 1.5 minutes minimum between innings
         self.audio_filter = AudioFilter()
         self.reference_pattern = None
         self.reference_sr = None
+        self.ref_normalized = None  # Peak-normalized float32 reference, set on load
+        self._matcher = None  # Overlap-save correlator holding the reference spectrum
         
     def load_refined_reference(self):
         """
@@ -27,7 +34,15 @@ class OptimizedInningDetector:
         """
         try:
             reference_file = "reference_sounds/refined_inning_transition_pattern.wav"
-            self.reference_pattern, self.reference_sr = librosa.load(reference_file, sr=self.sample_rate)
+            # Decoded once and memory-mapped from the .npy cache afterwards
+            # (shared through the page cache by the pool's worker processes)
+            self.reference_pattern = load_audio_cached(reference_file, self.sample_rate)
+            self.reference_sr = self.sample_rate
+            
+            # The reference never changes, so normalize it here once rather
+            # than on every video
+            self.ref_normalized = (self.reference_pattern / absmax(self.reference_pattern)).astype(np.float32)
+            self._matcher = PatternMatcher(self.ref_normalized)
             
             print(f"[SUCCESS] Refined reference loaded:")
             print(f"  Duration: {len(self.reference_pattern)/self.reference_sr:.2f}s")
@@ -55,7 +70,10 @@ class OptimizedInningDetector:
         # Load video audio
         try:
             print("Loading video audio...")
-            audio_data, audio_sr = librosa.load(video_file, sr=self.sample_rate, duration=max_duration)
+            # Decode the webm straight to float32 PCM through an ffmpeg pipe
+            # rather than librosa.load's audioread fallback
+            audio_sr = self.sample_rate
+            audio_data = load_audio_ffmpeg(video_file, audio_sr, duration=max_duration)
             duration_minutes = len(audio_data) / audio_sr / 60
             print(f"Loaded: {duration_minutes:.1f} minutes")
             
@@ -63,28 +81,42 @@ class OptimizedInningDetector:
             print(f"[ERROR] Failed to load audio: {e}")
             return []
         
-        # Apply frequency filtering (best approach from debug analysis)
+        # Apply frequency filtering (best approach from debug analysis),
+        # straight into a float32 buffer: the full-length passes and FFTs
+        # below then move half the bytes, and sosfilt's float64 output only
+        # ever exists one block at a time. The audio is not normalized up
+        # front; correlation is linear in it, so dividing by the audio peak
+        # is folded into the matcher's output scaling, saving a full pass
+        # over the signal. absmax finds the peak without an np.abs temporary.
         print("Applying frequency band filtering...")
-        filtered_audio = self.audio_filter.frequency_band_filter(audio_data)
-        
-        # Normalize both signals for correlation
+        audio_f32 = self.audio_filter.frequency_band_filter(audio_data, out=np.empty_like(audio_data))
+        del audio_data
         print("Computing cross-correlation with refined pattern...")
-        ref_normalized = self.reference_pattern / np.max(np.abs(self.reference_pattern))
-        audio_normalized = filtered_audio / np.max(np.abs(filtered_audio))
-        
-        # Cross-correlation
-        correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-        correlation = correlation / len(ref_normalized)
         
-        print(f"Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
+        # Cross-correlation by overlap-save: the audio is transformed in
+        # cache-sized frames (twice the reference length or 2^16, batched ~2^20
+        # samples per FFT call) against a reference spectrum computed once on
+        # load, so no full-length FFT buffers are ever allocated
+        correlation = self._matcher.correlate(audio_f32, scale=1.0 / absmax(audio_f32))
+        del audio_f32
         
         # Use optimized threshold based on actual correlation range
         # Current max is 0.003190, we detected 2/5 at 80% threshold
-        # Lower threshold to catch more transitions
-        percentile_threshold = np.percentile(correlation, 98.5)  # Less aggressive
+        # Lower threshold to catch more transitions. The 98.5th percentile
+        # plus min and max all come from one partition: the order statistics
+        # at both ends and around the percentile rank, interpolated as
+        # np.percentile does
+        n = len(correlation)
+        rank = 0.985 * (n - 1)  # Less aggressive
+        lo, hi = int(math.floor(rank)), int(math.ceil(rank))
+        ordered = np.partition(correlation, [0, lo, hi, n - 1])
+        percentile_threshold = ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+        correlation_min, correlation_max = ordered[0], ordered[n - 1]
+        del ordered
+        
+        print(f"Correlation range: {correlation_min:.6f} to {correlation_max:.6f}")
         
         # Use adaptive absolute threshold based on current correlation range
-        correlation_max = np.max(correlation)
         absolute_threshold = correlation_max * 0.6  # Lower to 60% of maximum correlation
         
         # Use the higher of the two for selectivity
@@ -94,14 +126,11 @@ class OptimizedInningDetector:
         print(f"Absolute threshold: {absolute_threshold:.6f}")
         print(f"Final threshold: {final_threshold:.6f}")
         
-        # Find peaks with realistic spacing (minimum 90 seconds between innings)
-        min_gap_samples = int(90 * audio_sr)  # 1.5 minutes minimum
-        
-        peak_indices, properties = signal.find_peaks(
-            correlation,
-            height=final_threshold,
-            distance=min_gap_samples
-        )
+        # Find peaks with realistic spacing (minimum 90 seconds between
+        # innings). Only samples at or above the threshold (under 1.5% of
+        # them, given the 98.5th-percentile floor) are considered as peaks,
+        # instead of find_peaks walking the whole correlation
+        peak_indices = pick_peaks(correlation, final_threshold, self.min_gap_samples)
         
         # Convert to timestamps and scores
         detections = []
@@ -135,15 +164,19 @@ class OptimizedInningDetector:
             ss = int(time_sec % 60)
             print(f"  {i+1:2d}: {mm:2d}:{ss:02d} ({time_sec:6.1f}s) - Score: {score:.6f}")
         
-        # Analyze timing patterns
+        # Times and scores as arrays, for the gap and matching math below
+        times = np.array([time for time, score in detections], dtype=np.float64)
+        scores = np.array([score for time, score in detections], dtype=np.float64)
+        
+        # Analyze timing patterns. Detections come sorted by score, so the
+        # gaps are taken between them in time order
         if len(detections) >= 2:
-            times = [time for time, score in detections]
-            gaps = [times[i+1] - times[i] for i in range(len(times)-1)]
-            avg_gap = np.mean(gaps)
+            gaps = np.diff(np.sort(times))
+            avg_gap = gaps.mean()
             
             print(f"\nTiming Analysis:")
             print(f"  Average gap: {avg_gap:.1f}s ({avg_gap/60:.1f} minutes)")
-            print(f"  Gap range: {min(gaps):.1f}s to {max(gaps):.1f}s")
+            print(f"  Gap range: {gaps.min():.1f}s to {gaps.max():.1f}s")
             
             # Assess if timing makes sense for baseball
             if 120 <= avg_gap <= 400:  # 2-7 minutes per inning
@@ -161,15 +194,12 @@ class OptimizedInningDetector:
                 known_mm = int(known_time // 60)
                 known_ss = int(known_time % 60)
                 
-                # Find closest detection
-                closest_detections = [
-                    (time, score) for time, score in detections
-                    if abs(time - known_time) <= tolerance
-                ]
+                # Best-scoring detection within tolerance
+                in_window = np.flatnonzero(np.abs(times - known_time) <= tolerance)
                 
-                if closest_detections:
-                    best_match = max(closest_detections, key=lambda x: x[1])
-                    match_time, match_score = best_match
+                if len(in_window):
+                    best = in_window[np.argmax(scores[in_window])]
+                    match_time, match_score = times[best], scores[best]
                     match_mm = int(match_time // 60)
                     match_ss = int(match_time % 60)
                     error = abs(match_time - known_time)
@@ -186,6 +216,30 @@ class OptimizedInningDetector:
         
         return None
 
+# Each worker process's detector: the parent's, with the reference already
+# loaded and its spectrum computed, handed over once by _init_worker rather
+# than rebuilt per video or per process
+_worker_detector = None
+
+def _init_worker(detector):
+    """Pool initializer: keep the parent's loaded detector for this process."""
+    global _worker_detector
+    _worker_detector = detector
+
+def _detect_in_worker(video_file):
+    """
+    Run detect_innings_optimized on one video in a worker process, with the
+    process's detector. Output is captured and returned so the parent can
+    print each video's log in order instead of interleaved.
+    
+    Returns:
+        (detections, log text)
+    """
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        detections = _worker_detector.detect_innings_optimized(video_file)
+    return detections, log.getvalue()
+
 def test_optimized_system():
     """
     Test the optimized pattern matching system on both videos.
@@ -220,26 +274,33 @@ def test_optimized_system():
     
     results = {}
     
-    for video in test_videos:
-        print(f"\n{'='*70}")
-        print(f"TESTING: {video['name']}")
-        print(f"Expected: {video['expected_accuracy']}")
-        print(f"{'='*70}")
-        
-        # Detect inning transitions
-        detections = detector.detect_innings_optimized(video['file'])
-        
-        # Analyze results
-        accuracy = detector.analyze_detection_results(
-            detections, 
-            video['name'], 
-            video['known_transitions']
-        )
+    # Each video's load + filter + correlation is independent and CPU-bound,
+    # so all videos are analyzed at once in a process pool
+    n_workers = min(len(test_videos), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(detector,)) as executor:
+        futures = [executor.submit(_detect_in_worker, video['file']) for video in test_videos]
         
-        results[video['name']] = {
-            'detections': len(detections),
-            'accuracy': accuracy
-        }
+        for video, future in zip(test_videos, futures):
+            print(f"\n{'='*70}")
+            print(f"TESTING: {video['name']}")
+            print(f"Expected: {video['expected_accuracy']}")
+            print(f"{'='*70}")
+            
+            # Detect inning transitions
+            detections, log = future.result()
+            print(log, end="")
+            
+            # Analyze results
+            accuracy = detector.analyze_detection_results(
+                detections, 
+                video['name'], 
+                video['known_transitions']
+            )
+            
+            results[video['name']] = {
+                'detections': len(detections),
+                'accuracy': accuracy
+            }
     
     # Final summary
     print(f"\n{'='*70}")
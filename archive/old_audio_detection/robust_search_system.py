@@ -5,30 +5,63 @@ The key insight: Instead of sliding a fixed pattern across the entire video,
 we'll search more intelligently around expected timing with multiple approaches.
 """
 
-import librosa
 import numpy as np
 from scipy import signal
+from scipy import fft as sp_fft
 from pathlib import Path
 from audio_filtering import AudioFilter
+from _corr_utils import absmax, correlate_and_peak, correlate_valid, fft_length, load_audio_ffmpeg
 import soundfile as sf
 
 class RobustInningDetector:
     def __init__(self):
         self.sample_rate = 22050
+        self.corr_sr = 11025  # Coarse rate for the blind full-video correlation
         self.audio_filter = AudioFilter()
         self.reference_pattern = None
+        self._ref_fft_cache = {}  # (ref length, FFT length) -> conj spectrum of normalized reference
+        self._corr_buf = None     # Reused correlation output buffer
+        self._prepared = {}       # Filtered/normalized audio of the last video searched
         
     def load_reference(self):
         """Load the refined reference pattern."""
         try:
             ref_file = "reference_sounds/refined_inning_transition_pattern.wav"
-            self.reference_pattern, _ = librosa.load(ref_file, sr=self.sample_rate)
+            self.reference_pattern = load_audio_ffmpeg(ref_file, self.sample_rate)
+            self._ref_fft_cache = {}
             print(f"[SUCCESS] Reference loaded: {len(self.reference_pattern)/self.sample_rate:.2f}s")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to load reference: {e}")
             return False
     
+    def correlate_valid(self, audio_norm, ref_norm):
+        """
+        _corr_utils.correlate_valid with a cached reference spectrum and a
+        reused output buffer.
+        
+        ref_norm must be the normalized self.reference_pattern (or its
+        decimated copy), since its spectrum is cached per length and FFT
+        length. The result is written into a buffer that is reused across
+        calls, so it is only valid until the next call; copy it if it must
+        outlive that.
+        """
+        ref_norm = ref_norm.astype(np.float32, copy=False)
+        n_out = len(audio_norm) - len(ref_norm) + 1
+        nfft = fft_length(len(audio_norm))
+        
+        # Repeated windows of the same size hit the same FFT length
+        cache_key = (len(ref_norm), nfft)
+        ref_fft = self._ref_fft_cache.get(cache_key)
+        if ref_fft is None:
+            ref_fft = np.conj(sp_fft.rfft(ref_norm, nfft, workers=-1))
+            self._ref_fft_cache[cache_key] = ref_fft
+        
+        if self._corr_buf is None or len(self._corr_buf) < n_out:
+            self._corr_buf = np.empty(n_out, dtype=np.float32)
+        
+        return correlate_valid(audio_norm, ref_norm, ref_fft=ref_fft, out=self._corr_buf)
+    
     def search_around_time(self, audio_data, center_time, search_window=10):
         """
         Search for pattern around a specific time with flexible window.
@@ -54,12 +87,11 @@ class RobustInningDetector:
         search_segment = audio_data[start_sample:end_sample]
         
         # Normalize both signals
-        ref_norm = self.reference_pattern / np.max(np.abs(self.reference_pattern))
-        search_norm = search_segment / np.max(np.abs(search_segment))
+        ref_norm = self.reference_pattern / absmax(self.reference_pattern)
+        search_norm = search_segment / absmax(search_segment)
         
         # Cross-correlation
-        correlation = signal.correlate(search_norm, ref_norm, mode='valid')
-        correlation = correlation / len(ref_norm)
+        correlation = self.correlate_valid(search_norm, ref_norm)
         
         # Find best match
         best_idx = np.argmax(correlation)
@@ -72,6 +104,24 @@ class RobustInningDetector:
         
         return best_time, best_score, correlations
     
+    def refine_peak(self, audio_norm, ref_norm, coarse_time, radius=0.1):
+        """
+        Re-correlate at the full sample rate within ±radius seconds of a peak
+        found on the decimated signal.
+        
+        Returns:
+            (time_sec, score)
+        """
+        center = int(round(coarse_time * self.sample_rate))
+        radius_samples = int(radius * self.sample_rate)
+        start = max(0, center - radius_samples)
+        end = min(len(audio_norm), center + radius_samples + len(ref_norm))
+        
+        correlation = self.correlate_valid(audio_norm[start:end], ref_norm)
+        best_idx = np.argmax(correlation)
+        
+        return (start + best_idx) / self.sample_rate, correlation[best_idx]
+    
     def test_timing_precision(self, video_file):
         """
         Test timing precision around known transitions to understand the issue.
@@ -80,11 +130,10 @@ class RobustInningDetector:
         print("TIMING PRECISION ANALYSIS")
         print("=" * 60)
         
-        # Load video
-        audio_data, _ = librosa.load(video_file, sr=self.sample_rate, duration=600)
-        
-        # Apply same filtering as in search
-        filtered_audio = self.audio_filter.frequency_band_filter(audio_data)
+        # Only ±max_window around each transition is ever searched, so decode
+        # and filter just that slice instead of the first 10 minutes
+        search_windows = [2, 5, 10]
+        max_window = max(search_windows)
         
         # Known transitions with descriptions
         known_transitions = [
@@ -108,15 +157,22 @@ class RobustInningDetector:
             print(f"\n{description}")
             print(f"Expected at: {expected_time}s")
             
+            # Load and filter the surrounding segment once (same filtering as in search)
+            segment_start = max(0, expected_time - max_window)
+            audio_segment = load_audio_ffmpeg(video_file, self.sample_rate,
+                                              offset=segment_start, duration=2 * max_window)
+            filtered_segment = self.audio_filter.frequency_band_filter(audio_segment).astype(np.float32)
+            
             # Search with different window sizes
-            for window in [2, 5, 10]:
+            for window in search_windows:
                 best_time, best_score, correlations = self.search_around_time(
-                    filtered_audio, expected_time, window
+                    filtered_segment, expected_time - segment_start, window
                 )
+                best_time += segment_start
                 
                 error = abs(best_time - expected_time)
-                mm_exp, ss_exp = int(expected_time // 60), int(expected_time % 60)
-                mm_found, ss_found = int(best_time // 60), int(best_time % 60)
+                mm_exp, ss_exp = divmod(int(expected_time), 60)
+                mm_found, ss_found = divmod(int(best_time), 60)
                 
                 print(f"  ±{window}s window: Found at {mm_found}:{ss_found:02d} "
                       f"(error: {error:.2f}s, score: {best_score:.6f})")
@@ -132,6 +188,22 @@ class RobustInningDetector:
         
         return results
     
+    def _prepare(self, video_file):
+        """
+        Load and filter a video's audio once, so the targeted and blind
+        searches of the same file share it. The normalized (and decimated)
+        copies used by the blind search are filled in lazily.
+        """
+        if self._prepared.get('video_file') != video_file:
+            audio_data = load_audio_ffmpeg(video_file, self.sample_rate)
+            self._prepared = {
+                'video_file': video_file,
+                'filtered': self.audio_filter.frequency_band_filter(audio_data).astype(np.float32),
+                'audio_norm': None,
+                'audio_coarse': None,
+            }
+        return self._prepared
+    
     def full_video_search_improved(self, video_file, expected_transitions=None):
         """
         Improved full video search using lessons from timing analysis.
@@ -140,9 +212,9 @@ class RobustInningDetector:
         print("IMPROVED FULL VIDEO SEARCH")
         print("=" * 60)
         
-        # Load and filter audio (full video)
-        audio_data, _ = librosa.load(video_file, sr=self.sample_rate)
-        filtered_audio = self.audio_filter.frequency_band_filter(audio_data)
+        # Load and filter audio (full video), reusing it if already prepared
+        prepared = self._prepare(video_file)
+        filtered_audio = prepared['filtered']
         
         if expected_transitions:
             print("TARGETED SEARCH around known transitions:")
@@ -159,33 +231,40 @@ class RobustInningDetector:
                 # Only accept if score is reasonable
                 if best_score > 0.001:  # Much lower threshold for targeted search
                     detections.append((best_time, best_score))
-                    mm, ss = int(best_time // 60), int(best_time % 60)
+                    mm, ss = divmod(int(best_time), 60)
                     error = abs(best_time - expected_time)
                     print(f"  Found at {mm}:{ss:02d} (error: {error:.1f}s, score: {best_score:.6f})")
                 else:
-                    mm_exp, ss_exp = int(expected_time // 60), int(expected_time % 60)
+                    mm_exp, ss_exp = divmod(int(expected_time), 60)
                     print(f"  No good match for {mm_exp}:{ss_exp:02d} (best score: {best_score:.6f})")
             
         else:
             print("BLIND SEARCH across entire video:")
             # Traditional correlation search but with better parameters
-            ref_norm = self.reference_pattern / np.max(np.abs(self.reference_pattern))
-            audio_norm = filtered_audio / np.max(np.abs(filtered_audio))
+            ref_norm = self.reference_pattern / absmax(self.reference_pattern)
+            if prepared['audio_norm'] is None:
+                prepared['audio_norm'] = filtered_audio / absmax(filtered_audio)
+            audio_norm = prepared['audio_norm']
             
-            correlation = signal.correlate(audio_norm, ref_norm, mode='valid')
-            correlation = correlation / len(ref_norm)
+            # Coarse pass on decimated audio - the transition cue sits well
+            # below the reduced Nyquist, and every correlation length halves
+            factor = self.sample_rate // self.corr_sr
+            if prepared['audio_coarse'] is None:
+                prepared['audio_coarse'] = signal.resample_poly(audio_norm, 1, factor).astype(np.float32)
+            ref_coarse = signal.resample_poly(ref_norm, 1, factor).astype(np.float32)
             
-            # Use more conservative threshold for full video to reduce false positives
-            threshold = np.percentile(correlation, 99.8)
-            min_gap_samples = int(60 * self.sample_rate)  # 1 minute minimum gap
+            # Kept as a float32 FFT correlation: an int16 direct-lag kernel is
+            # O(N*M) and loses to the FFT at this reference length even with
+            # integer SIMD throughput. Conservative threshold and a 1 minute
+            # gap reduce false positives across the full video.
+            coarse_matches, threshold, _ = correlate_and_peak(
+                prepared['audio_coarse'], ref_coarse, self.corr_sr,
+                percentile=99.8, min_gap_s=60, correlate=self.correlate_valid
+            )
             
-            peak_indices, _ = signal.find_peaks(correlation, height=threshold, distance=min_gap_samples)
-            
-            detections = []
-            for idx in peak_indices:
-                time_sec = idx / self.sample_rate
-                score = correlation[idx]
-                detections.append((time_sec, score))
+            # Fine pass: refine each coarse peak at the full sample rate
+            detections = [self.refine_peak(audio_norm, ref_norm, time_sec)
+                          for time_sec, _ in coarse_matches]
             
             print(f"Found {len(detections)} detections with {threshold:.6f} threshold")
         
@@ -203,9 +282,11 @@ class RobustInningDetector:
             print("No detections found!")
             return 0.0
         
+        lines = []
         for i, (time_sec, score) in enumerate(detections):
-            mm, ss = int(time_sec // 60), int(time_sec % 60)
-            print(f"  {i+1}: {mm}:{ss:02d} ({time_sec:.1f}s) - Score: {score:.6f}")
+            mm, ss = divmod(int(time_sec), 60)
+            lines.append(f"  {i+1}: {mm}:{ss:02d} ({time_sec:.1f}s) - Score: {score:.6f}")
+        print("\n".join(lines))
         
         if expected_transitions:
             print(f"\nVALIDATION:")
@@ -216,14 +297,14 @@ class RobustInningDetector:
             for expected in expected_transitions:
                 valid_expected += 1
                     
-                mm_exp, ss_exp = int(expected // 60), int(expected % 60)
+                mm_exp, ss_exp = divmod(int(expected), 60)
                 
                 matches = [(t, s) for t, s in detections if abs(t - expected) <= tolerance]
                 
                 if matches:
                     best_match = max(matches, key=lambda x: x[1])
                     match_time, match_score = best_match
-                    mm_match, ss_match = int(match_time // 60), int(match_time % 60)
+                    mm_match, ss_match = divmod(int(match_time), 60)
                     error = abs(match_time - expected)
                     
                     print(f"  [FOUND] {mm_exp}:{ss_exp:02d} -> {mm_match}:{ss_match:02d} "
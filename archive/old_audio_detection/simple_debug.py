@@ -8,6 +8,7 @@ from scipy import signal
 import soundfile as sf
 from pathlib import Path
 from audio_filtering import AudioFilter
+from _corr_utils import PatternMatcher
 
 def simple_correlation_test():
     """
@@ -42,18 +43,22 @@ def simple_correlation_test():
     # Test with no filtering first
     print(f"\nTesting correlation WITHOUT filtering:")
     
+    # Each reference is correlated against several signals below, so each
+    # gets a PatternMatcher: its spectrum is computed once and reused, and
+    # correlations come back already divided by the reference length
+    
     # Official reference
-    ref1_norm = official_ref / np.max(np.abs(official_ref))
-    audio_norm = audio_data / np.max(np.abs(audio_data))
-    corr1 = signal.correlate(audio_norm, ref1_norm, mode='valid')
-    max_corr1 = np.max(corr1) / len(ref1_norm)
+    ref1_norm = (official_ref / np.max(np.abs(official_ref))).astype(np.float32, copy=False)
+    matcher1 = PatternMatcher(ref1_norm)
+    audio_norm = (audio_data / np.max(np.abs(audio_data))).astype(np.float32, copy=False)
+    max_corr1 = np.max(matcher1.correlate(audio_norm))
     print(f"Official reference: Max correlation = {max_corr1:.6f}")
     
     # Old reference (if available)
     if old_ref is not None:
-        ref2_norm = old_ref / np.max(np.abs(old_ref))
-        corr2 = signal.correlate(audio_norm, ref2_norm, mode='valid')
-        max_corr2 = np.max(corr2) / len(ref2_norm)
+        ref2_norm = (old_ref / np.max(np.abs(old_ref))).astype(np.float32, copy=False)
+        matcher2 = PatternMatcher(ref2_norm)
+        max_corr2 = np.max(matcher2.correlate(audio_norm))
         print(f"Old refined pattern: Max correlation = {max_corr2:.6f}")
     
     # Test with frequency filtering (user said spectral was best, but let's try frequency too)
@@ -61,17 +66,15 @@ def simple_correlation_test():
     
     filter_system = AudioFilter()
     audio_filtered = filter_system.frequency_band_filter(audio_data)
-    audio_filt_norm = audio_filtered / np.max(np.abs(audio_filtered))
+    audio_filt_norm = (audio_filtered / np.max(np.abs(audio_filtered))).astype(np.float32, copy=False)
     
     # Official reference with filtering
-    corr1_filt = signal.correlate(audio_filt_norm, ref1_norm, mode='valid')
-    max_corr1_filt = np.max(corr1_filt) / len(ref1_norm)
+    max_corr1_filt = np.max(matcher1.correlate(audio_filt_norm))
     print(f"Official reference: Max correlation = {max_corr1_filt:.6f}")
     
     # Old reference with filtering
     if old_ref is not None:
-        corr2_filt = signal.correlate(audio_filt_norm, ref2_norm, mode='valid')
-        max_corr2_filt = np.max(corr2_filt) / len(ref2_norm)
+        max_corr2_filt = np.max(matcher2.correlate(audio_filt_norm))
         print(f"Old refined pattern: Max correlation = {max_corr2_filt:.6f}")
     
     # Save debug files for listening
@@ -93,20 +96,19 @@ def simple_correlation_test():
     # Use the better reference pattern
     if old_ref is not None and max_corr2_filt > max_corr1_filt:
         print("Using old refined pattern (better correlation)")
-        best_ref = old_ref
+        best_matcher = matcher2
     else:
         print("Using official reference pattern")
-        best_ref = official_ref
+        best_matcher = matcher1
     
     # Load more of original video
     full_audio, full_sr = librosa.load(audio_file, sr=22050, duration=600)  # 10 minutes
     full_filtered = filter_system.frequency_band_filter(full_audio)
     
-    # Correlation
-    ref_norm = best_ref / np.max(np.abs(best_ref))
-    full_norm = full_filtered / np.max(np.abs(full_filtered))
-    full_corr = signal.correlate(full_norm, ref_norm, mode='valid')
-    full_corr = full_corr / len(ref_norm)
+    # Correlation, reusing the chosen reference's spectrum (overlap-save, so
+    # the 10 minutes are never transformed at full length)
+    full_norm = (full_filtered / np.max(np.abs(full_filtered))).astype(np.float32, copy=False)
+    full_corr = best_matcher.correlate(full_norm)
     
     print(f"Full correlation range: {np.min(full_corr):.6f} to {np.max(full_corr):.6f}")
     
@@ -48,11 +48,11 @@ def test_downloaded_video():
     print("\n3. Applying pattern matching...")
     
     # Normalize (same method that gave us 100% accuracy)
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
+    ref_normalized = (reference_pattern / np.max(np.abs(reference_pattern))).astype(np.float32, copy=False)
+    audio_normalized = (audio_data / np.max(np.abs(audio_data))).astype(np.float32, copy=False)
     
     # Cross-correlation
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
+    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid', method='fft')
     correlation = correlation / len(ref_normalized)
     
     print(f"   Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
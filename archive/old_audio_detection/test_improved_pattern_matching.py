@@ -2,10 +2,9 @@
 Test improved pattern matching with all 5 inning transition examples.
 """
 
-import librosa
 import numpy as np
-from scipy import signal
 from pathlib import Path
+from _corr_utils import absmax, correlate_and_peak, load_audio_cached
 
 def test_improved_pattern_matching():
     """
@@ -27,7 +26,8 @@ def test_improved_pattern_matching():
     print("1. Loading improved reference pattern...")
     try:
         pattern_file = "reference_sounds/improved_inning_transition_pattern.wav"
-        reference_pattern, ref_sr = librosa.load(pattern_file, sr=22050)
+        ref_sr = 22050
+        reference_pattern = load_audio_cached(pattern_file, ref_sr)
         print(f"   [SUCCESS] Pattern loaded: {len(reference_pattern)/ref_sr:.2f}s, RMS: {np.sqrt(np.mean(reference_pattern**2)):.4f}")
     except Exception as e:
         print(f"   [ERROR] Failed to load pattern: {e}")
@@ -37,7 +37,8 @@ def test_improved_pattern_matching():
     print("\n2. Loading test audio (first 8 minutes)...")
     try:
         audio_file = "temp_audio/The CRAZIEST hit in Mario Baseball.webm"
-        audio_data, audio_sr = librosa.load(audio_file, sr=22050, duration=480)  # 8 minutes
+        audio_sr = 22050
+        audio_data = load_audio_cached(audio_file, audio_sr, duration=480)  # 8 minutes
         print(f"   [SUCCESS] Audio loaded: {len(audio_data)/audio_sr:.1f}s")
     except Exception as e:
         print(f"   [ERROR] Failed to load audio: {e}")
@@ -45,7 +46,7 @@ def test_improved_pattern_matching():
     
     # Test multiple normalization methods
     normalization_methods = [
-        ("Standard (max)", lambda x: x / np.max(np.abs(x))),
+        ("Standard (max)", lambda x: x / absmax(x)),
         ("Z-score", lambda x: (x - np.mean(x)) / np.std(x)),
         ("RMS", lambda x: x / np.sqrt(np.mean(x**2))),
     ]
@@ -67,31 +68,12 @@ def test_improved_pattern_matching():
             print(f"   [ERROR] Normalization failed for {method_name}")
             continue
         
-        # Compute cross-correlation
-        correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-        correlation = correlation / len(ref_normalized)
-        
-        print(f"   Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
-        
-        # Find peaks with low threshold
-        correlation_threshold = np.percentile(correlation, 99.5)  # Top 0.5% of correlation values
-        min_gap_samples = int(20 * audio_sr)  # 20 seconds minimum gap
-        
-        peak_indices, _ = signal.find_peaks(
-            correlation,
-            height=correlation_threshold,
-            distance=min_gap_samples
+        # Correlate and pick peaks (top 0.5% of correlation values, 20s minimum gap)
+        matches, correlation_threshold, correlation = correlate_and_peak(
+            audio_normalized, ref_normalized, audio_sr, percentile=99.5, min_gap_s=20
         )
         
-        # Convert to times and scores
-        matches = []
-        for idx in peak_indices:
-            time_seconds = idx / audio_sr
-            score = correlation[idx]
-            matches.append((time_seconds, score))
-        
-        # Sort by score
-        matches.sort(key=lambda x: x[1], reverse=True)
+        print(f"   Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
         
         print(f"   Found {len(matches)} peaks above {correlation_threshold:.6f}")
         
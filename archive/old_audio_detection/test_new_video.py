@@ -10,8 +10,8 @@ sys.path.append('audio_processing')
 from download import AudioDownloader
 import librosa
 import numpy as np
-from scipy import signal
 from pathlib import Path
+from _corr_utils import absmax, correlate_and_peak, pick_peaks
 
 def test_new_video():
     """
@@ -91,34 +91,17 @@ def test_new_video():
     print("-" * 40)
     
     # Use the proven normalization method (standard max)
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
+    ref_normalized = reference_pattern / absmax(reference_pattern)
+    audio_normalized = audio_data / absmax(audio_data)
     
+    # Use adaptive threshold (top 0.5% like before), 20 seconds minimum gap
     print("Computing cross-correlation...")
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-    correlation = correlation / len(ref_normalized)
-    
-    print(f"Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
-    
-    # Use adaptive threshold (top 0.5% like before)
-    correlation_threshold = np.percentile(correlation, 99.5)
-    min_gap_samples = int(20 * audio_sr)  # 20 seconds minimum gap
-    
-    peak_indices, _ = signal.find_peaks(
-        correlation,
-        height=correlation_threshold,
-        distance=min_gap_samples
+    matches, correlation_threshold, correlation = correlate_and_peak(
+        audio_normalized, ref_normalized, audio_sr, percentile=99.5, min_gap_s=20
     )
+    min_gap_samples = int(20 * audio_sr)
     
-    # Convert to times and scores
-    matches = []
-    for idx in peak_indices:
-        time_seconds = idx / audio_sr
-        score = correlation[idx]
-        matches.append((time_seconds, score))
-    
-    # Sort by score
-    matches.sort(key=lambda x: x[1], reverse=True)
+    print(f"Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
     
     print(f"Found {len(matches)} potential inning transitions above threshold {correlation_threshold:.6f}")
     
@@ -166,7 +149,7 @@ def test_new_video():
         # Try with much lower threshold
         print(f"\nTrying with much lower threshold...")
         low_threshold = np.percentile(correlation, 95)  # Top 5% instead of 0.5%
-        low_peaks, _ = signal.find_peaks(correlation, height=low_threshold, distance=min_gap_samples)
+        low_peaks = pick_peaks(correlation, low_threshold, min_gap_samples)
         
         if len(low_peaks) > 0:
             print(f"With 95th percentile threshold ({low_threshold:.6f}): {len(low_peaks)} peaks")
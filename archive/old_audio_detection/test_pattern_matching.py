@@ -2,10 +2,10 @@
 Quick test of pattern matching with optimized processing.
 """
 
-import librosa
 import numpy as np
 import soundfile as sf
-from scipy import signal
+from _corr_utils import (PatternMatcher, absmax, best_match_per_known, format_mmss, load_audio_cached,
+                         peak_times_scores, pick_peaks)
 from pathlib import Path
 
 def quick_pattern_test():
@@ -19,7 +19,8 @@ def quick_pattern_test():
     print("Loading reference pattern...")
     try:
         pattern_file = "reference_sounds/inning_transition_average_pattern.wav"
-        reference_pattern, ref_sr = librosa.load(pattern_file, sr=22050)
+        ref_sr = 22050
+        reference_pattern = load_audio_cached(pattern_file, ref_sr)
         print(f"[SUCCESS] Reference loaded: {len(reference_pattern)/ref_sr:.2f}s, {len(reference_pattern):,} samples")
     except Exception as e:
         print(f"[ERROR] Failed to load reference: {e}")
@@ -29,21 +30,22 @@ def quick_pattern_test():
     print("\nLoading test audio (first 8 minutes)...")
     try:
         audio_file = "temp_audio/The CRAZIEST hit in Mario Baseball.webm"
-        audio_data, audio_sr = librosa.load(audio_file, sr=22050, duration=480)  # 8 minutes
+        audio_sr = 22050
+        audio_data = load_audio_cached(audio_file, audio_sr, duration=480)  # 8 minutes
         print(f"[SUCCESS] Audio loaded: {len(audio_data)/audio_sr:.1f}s, {len(audio_data):,} samples")
     except Exception as e:
         print(f"[ERROR] Failed to load audio: {e}")
         return
     
-    # Normalize signals
+    # Normalize signals in place (no full-length copy of the audio)
     print("\nNormalizing signals...")
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
+    ref_normalized = np.divide(reference_pattern, absmax(reference_pattern), out=reference_pattern)
+    audio_normalized = np.divide(audio_data, absmax(audio_data), out=audio_data)
     
     # Compute correlation (optimized)
     print("Computing cross-correlation...")
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-    correlation = correlation / len(ref_normalized)  # Normalize
+    matcher = PatternMatcher(ref_normalized)  # Reference FFT computed once
+    correlation = matcher.correlate(audio_normalized)  # Scaled by 1/len(ref)
     
     print(f"[SUCCESS] Correlation computed: {len(correlation):,} values")
     print(f"  Max correlation: {np.max(correlation):.4f}")
@@ -54,30 +56,21 @@ def quick_pattern_test():
     correlation_threshold = 0.15  # Lower threshold
     min_gap_samples = int(30 * audio_sr)  # 30 seconds minimum gap
     
-    peak_indices, properties = signal.find_peaks(
-        correlation,
-        height=correlation_threshold,
-        distance=min_gap_samples
-    )
+    peak_indices = pick_peaks(correlation, correlation_threshold, min_gap_samples)
     
     print(f"Found {len(peak_indices)} peaks above {correlation_threshold}")
     
-    # Convert to times and scores
-    matches = []
-    for idx in peak_indices:
-        time_seconds = idx / audio_sr
-        correlation_score = correlation[idx]
-        matches.append((time_seconds, correlation_score))
-    
-    # Sort by score
-    matches.sort(key=lambda x: x[1], reverse=True)
+    # Convert to times and scores, sorted by score
+    times, scores = peak_times_scores(peak_indices, correlation, audio_sr)
+    matches = list(zip(times, scores))
     
     # Display results
     print(f"\nTOP MATCHES:")
-    for i, (time, score) in enumerate(matches[:10]):
-        minutes = int(time // 60)
-        seconds = int(time % 60)
-        print(f"  {i+1}: {minutes:2d}:{seconds:02d} ({time:6.1f}s) - Score: {score:.4f}")
+    top_times, top_scores = times[:10], scores[:10]
+    lines = [f"  {i+1}: {label} ({time:6.1f}s) - Score: {score:.4f}"
+             for i, (label, time, score) in enumerate(zip(format_mmss(top_times), top_times, top_scores))]
+    if lines:
+        print("\n".join(lines))
     
     # Check against known times
     known_times = [148, 243, 454]  # 2:28, 4:03, 7:34
@@ -86,22 +79,18 @@ def quick_pattern_test():
     tolerance = 5.0  # 5 second tolerance
     found_count = 0
     
-    for known_time in known_times:
+    # Best-scoring match within tolerance of each known time
+    best_indices = best_match_per_known(times, known_times, tolerance)
+    
+    for known_time, best_idx in zip(known_times, best_indices):
         if known_time > 480:  # Skip if beyond our 8-minute test
             continue
             
         known_mm = int(known_time // 60)
         known_ss = int(known_time % 60)
         
-        # Find closest match
-        close_matches = [
-            (time, score) for time, score in matches
-            if abs(time - known_time) <= tolerance
-        ]
-        
-        if close_matches:
-            best_match = max(close_matches, key=lambda x: x[1])
-            match_time, match_score = best_match
+        if best_idx >= 0:
+            match_time, match_score = times[best_idx], scores[best_idx]
             match_mm = int(match_time // 60)
             match_ss = int(match_time % 60)
             error = abs(match_time - known_time)
@@ -2,9 +2,8 @@
 Test the refined pattern matching to see if we can now detect the 4:03 transition.
 """
 
-import librosa
 import numpy as np
-from scipy import signal
+from _corr_utils import PatternMatcher, absmax, format_mmss, load_audio_cached, peak_times_scores, pick_peaks
 
 def test_refined_pattern_matching():
     """
@@ -27,7 +26,8 @@ def test_refined_pattern_matching():
     print("\n1. Loading refined reference pattern...")
     try:
         pattern_file = "reference_sounds/refined_inning_transition_pattern.wav"
-        reference_pattern, ref_sr = librosa.load(pattern_file, sr=22050)
+        ref_sr = 22050
+        reference_pattern = load_audio_cached(pattern_file, ref_sr)
         print(f"   [SUCCESS] Refined pattern loaded: {len(reference_pattern)/ref_sr:.2f}s")
         print(f"   RMS: {np.sqrt(np.mean(reference_pattern**2)):.4f}")
     except Exception as e:
@@ -38,7 +38,8 @@ def test_refined_pattern_matching():
     print("\n2. Loading test audio (first 8 minutes)...")
     try:
         audio_file = "temp_audio/The CRAZIEST hit in Mario Baseball.webm"
-        audio_data, audio_sr = librosa.load(audio_file, sr=22050, duration=480)
+        audio_sr = 22050
+        audio_data = load_audio_cached(audio_file, audio_sr, duration=480)
         print(f"   [SUCCESS] Audio loaded: {len(audio_data)/audio_sr:.1f}s")
     except Exception as e:
         print(f"   [ERROR] Failed to load audio: {e}")
@@ -47,13 +48,13 @@ def test_refined_pattern_matching():
     # Test with standard max normalization (which worked best before)
     print(f"\n3. Computing cross-correlation with refined pattern...")
     
-    # Normalize signals  
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
+    # Normalize signals in place (no full-length copy of the audio)
+    ref_normalized = np.divide(reference_pattern, absmax(reference_pattern), out=reference_pattern)
+    audio_normalized = np.divide(audio_data, absmax(audio_data), out=audio_data)
     
     # Compute cross-correlation
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-    correlation = correlation / len(ref_normalized)
+    matcher = PatternMatcher(ref_normalized)  # Reference FFT computed once
+    correlation = matcher.correlate(audio_normalized)  # Scaled by 1/len(ref)
     
     print(f"   Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
     
@@ -61,56 +62,51 @@ def test_refined_pattern_matching():
     correlation_threshold = np.percentile(correlation, 99.5)  # Top 0.5%
     min_gap_samples = int(20 * audio_sr)  # 20 seconds minimum gap
     
-    peak_indices, _ = signal.find_peaks(
-        correlation,
-        height=correlation_threshold,
-        distance=min_gap_samples
-    )
+    peak_indices = pick_peaks(correlation, correlation_threshold, min_gap_samples)
     
-    # Convert to times and scores
-    matches = []
-    for idx in peak_indices:
-        time_seconds = idx / audio_sr
-        score = correlation[idx]
-        matches.append((time_seconds, score))
-    
-    # Sort by score
-    matches.sort(key=lambda x: x[1], reverse=True)
+    # Convert to times and scores, sorted by score
+    times, scores = peak_times_scores(peak_indices, correlation, audio_sr)
+    matches = list(zip(times, scores))
     
     print(f"   Found {len(matches)} peaks above threshold {correlation_threshold:.6f}")
     
     # Show top matches
     print(f"\n4. Top correlation matches:")
-    for i, (time, score) in enumerate(matches[:10]):
-        mm = int(time // 60)
-        ss = int(time % 60)
-        print(f"   {i+1}: {mm:2d}:{ss:02d} ({time:6.1f}s) - Score: {score:.6f}")
+    top_times, top_scores = times[:10], scores[:10]
+    lines = [f"   {i+1}: {label} ({time:6.1f}s) - Score: {score:.6f}"
+             for i, (label, time, score) in enumerate(zip(format_mmss(top_times), top_times, top_scores))]
+    if lines:
+        print("\n".join(lines))
     
     # Check against known transitions with wider tolerance
     print(f"\n5. Validation against known transitions:")
     tolerance = 8.0  # Increased tolerance since we have timing adjustments
     found_count = 0
     
-    for known in known_transitions:
+    # Check both original and refined timing
+    original_times = np.array([
+        int(known["original"].split(':')[0]) * 60 + int(known["original"].split(':')[1])
+        for known in known_transitions
+    ])
+    target_times = np.array([known["time_seconds"] for known in known_transitions])
+    
+    # Matches near either original or refined timing, for every transition at
+    # once; matches are sorted by score, so the first one near is the best
+    near = ((np.abs(times[:, None] - original_times[None, :]) <= tolerance) |
+            (np.abs(times[:, None] - target_times[None, :]) <= tolerance))
+    if len(times) > 0:
+        best_indices = np.where(near.any(axis=0), near.argmax(axis=0), -1)
+    else:
+        best_indices = np.full(len(known_transitions), -1)
+    
+    for known, original_seconds, best_idx in zip(known_transitions, original_times, best_indices):
         original_time = known["original"]
-        refined_time = known["refined"]
         target_time = known["time_seconds"]
         description = known["description"]
         is_missing_target = "MISSING TARGET" in description
         
-        # Check both original and refined timing
-        original_seconds = int(original_time.split(':')[0]) * 60 + int(original_time.split(':')[1])
-        
-        # Find matches near either original or refined timing
-        close_matches = []
-        for time, score in matches:
-            if (abs(time - original_seconds) <= tolerance or 
-                abs(time - target_time) <= tolerance):
-                close_matches.append((time, score))
-        
-        if close_matches:
-            best_match = max(close_matches, key=lambda x: x[1])
-            match_time, match_score = best_match
+        if best_idx >= 0:
+            match_time, match_score = times[best_idx], scores[best_idx]
             match_mm = int(match_time // 60)
             match_ss = int(match_time % 60)
             error_original = abs(match_time - original_seconds)
@@ -150,19 +146,19 @@ def test_refined_pattern_matching():
     target_4_03 = 4*60 + 3  # 243 seconds
     refined_4_03 = 4*60 + 2  # 242 seconds (refined location)
     
-    matches_near_4_03 = [
-        (time, score) for time, score in matches 
-        if abs(time - target_4_03) <= 10 or abs(time - refined_4_03) <= 10
-    ]
+    near_4_03 = (np.abs(times - target_4_03) <= 10) | (np.abs(times - refined_4_03) <= 10)
+    matches_near_4_03 = list(zip(times[near_4_03], scores[near_4_03]))
     
     if matches_near_4_03:
         print(f"   [SUCCESS] Found {len(matches_near_4_03)} matches near 4:03!")
-        for time, score in matches_near_4_03:
-            mm = int(time // 60)
-            ss = int(time % 60)
-            error_original = abs(time - target_4_03)
-            error_refined = abs(time - refined_4_03)
-            print(f"     {mm:2d}:{ss:02d} - Score: {score:.6f} (errors: {error_original:.1f}s/{error_refined:.1f}s)")
+        near_times = times[near_4_03]
+        errors_original = np.abs(near_times - target_4_03)
+        errors_refined = np.abs(near_times - refined_4_03)
+        print("\n".join(
+            f"     {label} - Score: {score:.6f} (errors: {error_original:.1f}s/{error_refined:.1f}s)"
+            for label, score, error_original, error_refined
+            in zip(format_mmss(near_times), scores[near_4_03], errors_original, errors_refined)
+        ))
     else:
         print(f"   [STILL MISSING] No matches found near 4:03 area")
         
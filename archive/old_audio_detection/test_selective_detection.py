@@ -5,7 +5,7 @@ to target exactly 9 inning transitions for a full game.
 
 import librosa
 import numpy as np
-from scipy import signal
+from _corr_utils import PatternMatcher, absmax, format_mmss, peak_times_scores, pick_peaks, stream_audio_ffmpeg
 from pathlib import Path
 
 def test_selective_detection():
@@ -26,30 +26,35 @@ def test_selective_detection():
     
     audio_file = str(audio_files[0])
     
-    # Load reference pattern and audio
-    print("\n1. Loading reference pattern and audio...")
+    # Load reference pattern; the video audio is streamed during correlation
+    print("\n1. Loading reference pattern...")
     try:
         pattern_file = "reference_sounds/refined_inning_transition_pattern.wav"
         reference_pattern, ref_sr = librosa.load(pattern_file, sr=22050)
-        
-        # Load full video (not just 10 minutes) to capture all 9 innings
-        audio_data, audio_sr = librosa.load(audio_file, sr=22050, duration=1800)  # 30 minutes max
-        duration_minutes = len(audio_data) / audio_sr / 60
-        
         print(f"   Reference pattern: {len(reference_pattern)/ref_sr:.2f}s")
-        print(f"   Video audio: {duration_minutes:.1f} minutes loaded")
-        
     except Exception as e:
         print(f"   Error: {e}")
         return
     
-    # Compute correlation once
+    # Compute correlation once, streaming the full video (not just 10 minutes)
+    # so all 9 innings are captured without holding 30 minutes of audio
     print("\n2. Computing cross-correlation...")
-    ref_normalized = reference_pattern / np.max(np.abs(reference_pattern))
-    audio_normalized = audio_data / np.max(np.abs(audio_data))
+    audio_sr = 22050
+    ref_normalized = np.divide(reference_pattern, absmax(reference_pattern), out=reference_pattern)
+    
+    try:
+        matcher = PatternMatcher(ref_normalized)  # Reference FFT computed once
+        blocks = stream_audio_ffmpeg(audio_file, audio_sr, duration=1800)  # 30 minutes max
+        correlation, audio_peak = matcher.correlate_blocks(blocks)  # Scaled by 1/len(ref)
+    except Exception as e:
+        print(f"   Error: {e}")
+        return
+    
+    # Same as correlating the peak-normalized audio
+    correlation /= audio_peak
     
-    correlation = signal.correlate(audio_normalized, ref_normalized, mode='valid')
-    correlation = correlation / len(ref_normalized)
+    duration_minutes = (len(correlation) + len(ref_normalized) - 1) / audio_sr / 60
+    print(f"   Video audio: {duration_minutes:.1f} minutes streamed")
     
     print(f"   Correlation range: {np.min(correlation):.6f} to {np.max(correlation):.6f}")
     
@@ -62,27 +67,24 @@ def test_selective_detection():
     best_results = None
     best_threshold = None
     
-    for percentile in threshold_levels:
-        threshold = np.percentile(correlation, percentile)
-        
-        # Find peaks
-        peaks, _ = signal.find_peaks(correlation, height=threshold, distance=min_gap_samples)
-        
-        # Convert to times
-        matches = []
-        for idx in peaks:
-            time_sec = idx / audio_sr
-            score = correlation[idx]
-            matches.append((time_sec, score))
-        
-        matches.sort(key=lambda x: x[1], reverse=True)
+    # Find peaks once, at the loosest threshold. Gap suppression keeps the
+    # stronger peak first, so the peaks for any stricter threshold are
+    # exactly these peaks scoring at or above it.
+    thresholds = np.percentile(correlation, threshold_levels)
+    peaks = pick_peaks(correlation, thresholds.min(), min_gap_samples)
+    all_times, all_scores = peak_times_scores(peaks, correlation, audio_sr)
+    
+    for percentile, threshold in zip(threshold_levels, thresholds):
+        # Times sorted by score
+        above = all_scores >= threshold
+        times, scores = all_times[above], all_scores[above]
+        matches = list(zip(times, scores))
         
         print(f"   {percentile:4.1f}th percentile (threshold {threshold:.6f}): {len(matches):2d} matches")
         
         # Show top matches for this threshold
         if len(matches) > 0:
-            top_3 = matches[:3]
-            times_str = ", ".join([f"{int(t//60)}:{int(t%60):02d}" for t, s in top_3])
+            times_str = ", ".join(format_mmss(times[:3], minute_width=1))
             print(f"        Top matches: {times_str}")
         
         # Track the best result (closest to 9 transitions)
@@ -97,15 +99,16 @@ def test_selective_detection():
     
     if best_results:
         print(f"\n   Detected inning transitions:")
-        for i, (time, score) in enumerate(best_results):
-            mm = int(time // 60)
-            ss = int(time % 60)
-            print(f"   {i+1:2d}: {mm:2d}:{ss:02d} ({time:6.1f}s) - Score: {score:.6f}")
+        best_times = [time for time, score in best_results]
+        print("\n".join(
+            f"   {i+1:2d}: {label} ({time:6.1f}s) - Score: {score:.6f}"
+            for i, (label, (time, score)) in enumerate(zip(format_mmss(best_times), best_results))
+        ))
         
         # Analyze timing pattern
         if len(best_results) >= 2:
-            times_only = [time for time, score in best_results]
-            gaps = [times_only[i+1] - times_only[i] for i in range(len(times_only)-1)]
+            times_only = np.array([time for time, score in best_results])
+            gaps = np.diff(times_only)
             avg_gap = np.mean(gaps)
             
             print(f"\n   Timing Analysis:")
@@ -3,9 +3,11 @@ Database Manager for DingerStats
 Handles SQLite database operations for video metadata and game results
 """
 
+import operator
 import sqlite3
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional
 from datetime import datetime
 
 
@@ -13,6 +15,9 @@ class DatabaseManager:
     def __init__(self, db_path: str = "database/dingerstats.db"):
         """Initialize database connection"""
         self.db_path = db_path
+        # One connection per thread, opened on first use and reused after
+        # (sqlite3 connections must stay on the thread that created them)
+        self._local = threading.local()
         self.ensure_database_exists()
 
     def ensure_database_exists(self):
@@ -30,6 +35,13 @@ class DatabaseManager:
             conn.executescript(schema)
             conn.commit()
 
+            # WAL is persistent (stored in the database file), so switching
+            # once here covers every later connection: readers no longer
+            # block the writer, and commits append to the WAL instead of
+            # rewriting a rollback journal. In-memory databases can't use WAL.
+            if self.db_path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+
         # Run migrations for existing databases
         self._run_migrations()
 
@@ -66,32 +78,96 @@ class DatabaseManager:
                 print("  Model name migration complete!")
 
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """
+        Get this thread's database connection, opening it on first use.
+
+        The connection is shared by every call on the same thread, so use it
+        as `with db.get_connection() as conn:` (which commits or rolls back
+        but leaves it open) rather than closing it.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # The connection lives as long as the thread, so its prepared
+            # statement cache (keyed on SQL text) persists across calls; size
+            # it to hold every query this class and its callers issue
+            conn = sqlite3.connect(self.db_path, cached_statements=256)
+            conn.row_factory = sqlite3.Row  # Enable column access by name
+            self._apply_pragmas(conn)
+            self._local.conn = conn
         return conn
 
+    def close(self):
+        """Close this thread's database connection, if one is open"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            # Let SQLite refresh planner statistics for the indexes this
+            # connection's queries used (cheap; a no-op when nothing changed)
+            conn.execute("PRAGMA optimize")
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _apply_pragmas(conn: sqlite3.Connection):
+        """Apply per-connection tuning (these settings don't persist in the file)"""
+        # With WAL, NORMAL only fsyncs at checkpoints - a power loss can drop
+        # the last commits but never corrupts the database
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")  # 64 MB page cache
+        conn.execute("PRAGMA mmap_size=268435456")  # 256 MB memory-mapped reads
+        conn.execute("PRAGMA busy_timeout=5000")  # Wait up to 5s on a locked database
+
+    def _iter_dicts(self, sql: str, params: tuple = ()) -> Iterator[Dict]:
+        """
+        Run a query and yield each row as a plain dict, lazily.
+
+        Rows come back as tuples and are zipped with the column names read
+        once per query, skipping the sqlite3.Row -> dict double conversion.
+        """
+        cursor = self.get_connection().cursor()
+        cursor.row_factory = None
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        for row in cursor:
+            yield dict(zip(columns, row))
+
     # ==================== VIDEO OPERATIONS ====================
 
+    # Upsert in place (rather than INSERT OR REPLACE's delete + re-insert),
+    # which keeps the row's id, created_at and is_game/manual_review flags
+    _INSERT_VIDEO_SQL = """
+        INSERT INTO videos
+        (video_id, title, description, published_at, channel_id,
+         playlist_id, duration, thumbnail_url)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(video_id) DO UPDATE SET
+            title = excluded.title,
+            description = excluded.description,
+            published_at = excluded.published_at,
+            channel_id = excluded.channel_id,
+            playlist_id = excluded.playlist_id,
+            duration = excluded.duration,
+            thumbnail_url = excluded.thumbnail_url
+    """
+
+    # Column order of _INSERT_VIDEO_SQL; every column but video_id defaults to ''
+    _VIDEO_COLUMNS = ('video_id', 'title', 'description', 'published_at', 'channel_id',
+                      'playlist_id', 'duration', 'thumbnail_url')
+    _VIDEO_DEFAULTS = dict.fromkeys(_VIDEO_COLUMNS[1:], '')
+    _video_getter = staticmethod(operator.itemgetter(*_VIDEO_COLUMNS))
+
+    @classmethod
+    def _video_row(cls, video_data: Dict) -> tuple:
+        """Parameters for _INSERT_VIDEO_SQL from a video dict"""
+        # Merging over the defaults and fetching every column with one
+        # itemgetter stays in C, instead of eight dict.get calls per video
+        return cls._video_getter({**cls._VIDEO_DEFAULTS, **video_data})
+
     def insert_video(self, video_data: Dict) -> bool:
         """Insert or update video metadata"""
         try:
             with self.get_connection() as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO videos
-                    (video_id, title, description, published_at, channel_id,
-                     playlist_id, duration, thumbnail_url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    video_data['video_id'],
-                    video_data.get('title', ''),
-                    video_data.get('description', ''),
-                    video_data.get('published_at', ''),
-                    video_data.get('channel_id', ''),
-                    video_data.get('playlist_id', ''),
-                    video_data.get('duration', ''),
-                    video_data.get('thumbnail_url', '')
-                ))
+                conn.execute(self._INSERT_VIDEO_SQL, self._video_row(video_data))
                 conn.commit()
             return True
         except Exception as e:
@@ -99,12 +175,16 @@ class DatabaseManager:
             return False
 
     def batch_insert_videos(self, videos: List[Dict]) -> int:
-        """Batch insert multiple videos"""
-        success_count = 0
-        for video in videos:
-            if self.insert_video(video):
-                success_count += 1
-        return success_count
+        """Batch insert multiple videos in a single transaction"""
+        try:
+            rows = list(map(self._video_row, videos))
+            with self.get_connection() as conn:
+                conn.executemany(self._INSERT_VIDEO_SQL, rows)
+                conn.commit()
+            return len(rows)
+        except Exception as e:
+            print(f"Error batch inserting {len(videos)} videos: {e}")
+            return 0
 
     def get_video(self, video_id: str) -> Optional[Dict]:
         """Get video by ID"""
@@ -117,9 +197,7 @@ class DatabaseManager:
 
     def get_all_videos(self) -> List[Dict]:
         """Get all videos"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("SELECT * FROM videos ORDER BY published_at DESC")
-            return [dict(row) for row in cursor.fetchall()]
+        return list(self._iter_dicts("SELECT * FROM videos ORDER BY published_at DESC"))
 
     def get_videos_by_playlist(self, playlist_id: str, include_non_games: bool = True) -> List[Dict]:
         """
@@ -129,18 +207,11 @@ class DatabaseManager:
             playlist_id: Playlist ID to filter by
             include_non_games: If False, only return videos where is_game=1
         """
-        with self.get_connection() as conn:
-            if include_non_games:
-                cursor = conn.execute(
-                    "SELECT * FROM videos WHERE playlist_id = ? ORDER BY published_at DESC",
-                    (playlist_id,)
-                )
-            else:
-                cursor = conn.execute(
-                    "SELECT * FROM videos WHERE playlist_id = ? AND is_game = 1 ORDER BY published_at DESC",
-                    (playlist_id,)
-                )
-            return [dict(row) for row in cursor.fetchall()]
+        if include_non_games:
+            sql = "SELECT * FROM videos WHERE playlist_id = ? ORDER BY published_at DESC"
+        else:
+            sql = "SELECT * FROM videos WHERE playlist_id = ? AND is_game = 1 ORDER BY published_at DESC"
+        return list(self._iter_dicts(sql, (playlist_id,)))
 
     def mark_video_as_non_game(self, video_id: str, manual: bool = True) -> bool:
         """
@@ -184,38 +255,63 @@ class DatabaseManager:
 
     # ==================== GAME RESULTS OPERATIONS ====================
 
+    _INSERT_GAME_RESULT_SQL = """
+        INSERT INTO game_results
+        (video_id, player_a, player_b, team_a, team_b, score_a, score_b, winner,
+         game_type, game_summary, commentary_summary, raw_response, confidence, prompt_version, model_name)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    @classmethod
+    def _insert_game_result(cls, conn: sqlite3.Connection, result_data: Dict):
+        """Execute the game_results insert on conn without committing"""
+        conn.execute(cls._INSERT_GAME_RESULT_SQL, (
+            result_data['video_id'],
+            result_data.get('player_a'),
+            result_data.get('player_b'),
+            result_data.get('team_a'),
+            result_data.get('team_b'),
+            result_data.get('score_a'),
+            result_data.get('score_b'),
+            result_data.get('winner'),
+            result_data.get('game_type'),
+            result_data.get('game_summary'),
+            result_data.get('commentary_summary'),
+            result_data.get('raw_response'),
+            result_data.get('confidence', 'medium'),
+            result_data.get('prompt_version', 'v2'),
+            result_data.get('model_name', 'gemini-2.0-flash-exp')
+        ))
+
     def insert_game_result(self, result_data: Dict) -> bool:
         """Insert game analysis result"""
         try:
             with self.get_connection() as conn:
-                conn.execute("""
-                    INSERT INTO game_results
-                    (video_id, player_a, player_b, team_a, team_b, score_a, score_b, winner,
-                     game_type, game_summary, commentary_summary, raw_response, confidence, prompt_version, model_name)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    result_data['video_id'],
-                    result_data.get('player_a'),
-                    result_data.get('player_b'),
-                    result_data.get('team_a'),
-                    result_data.get('team_b'),
-                    result_data.get('score_a'),
-                    result_data.get('score_b'),
-                    result_data.get('winner'),
-                    result_data.get('game_type'),
-                    result_data.get('game_summary'),
-                    result_data.get('commentary_summary'),
-                    result_data.get('raw_response'),
-                    result_data.get('confidence', 'medium'),
-                    result_data.get('prompt_version', 'v2'),
-                    result_data.get('model_name', 'gemini-2.0-flash-exp')
-                ))
+                self._insert_game_result(conn, result_data)
                 conn.commit()
             return True
         except Exception as e:
             print(f"Error inserting game result for {result_data.get('video_id')}: {e}")
             return False
 
+    def complete_game_result(self, result_data: Dict) -> bool:
+        """
+        Insert a game result and mark its video completed in one transaction
+
+        Saves a commit per analyzed video over insert_game_result followed by
+        update_processing_status, and the status can never say 'completed'
+        without the result row (or the reverse).
+        """
+        try:
+            with self.get_connection() as conn:
+                self._insert_game_result(conn, result_data)
+                self._write_processing_status(conn, result_data['video_id'], 'completed')
+                conn.commit()
+            return True
+        except Exception as e:
+            print(f"Error storing game result for {result_data.get('video_id')}: {e}")
+            return False
+
     def get_game_result(self, video_id: str) -> Optional[Dict]:
         """Get game result for a video"""
         with self.get_connection() as conn:
@@ -226,47 +322,73 @@ class DatabaseManager:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    def get_processed_video_ids(self, prompt_version: str = None) -> set:
+        """
+        IDs of every video with at least one game result, in one query
+
+        Filter a video list against this set rather than calling
+        get_game_result per video to decide what to skip.
+
+        Args:
+            prompt_version: If given, only count results from this prompt version
+        """
+        if prompt_version is None:
+            cursor = self.get_connection().execute("SELECT DISTINCT video_id FROM game_results")
+        else:
+            cursor = self.get_connection().execute(
+                "SELECT DISTINCT video_id FROM game_results WHERE prompt_version = ?",
+                (prompt_version,)
+            )
+        return {row[0] for row in cursor}
+
+    def iter_all_game_results(self) -> Iterator[Dict]:
+        """Stream all game results one row at a time (newest first)"""
+        return self._iter_dicts("""
+            SELECT gr.*, v.title, v.published_at
+            FROM game_results gr
+            JOIN videos v ON gr.video_id = v.video_id
+            ORDER BY gr.analyzed_at DESC
+        """)
+
     def get_all_game_results(self) -> List[Dict]:
         """Get all game results"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT gr.*, v.title, v.published_at
-                FROM game_results gr
-                JOIN videos v ON gr.video_id = v.video_id
-                ORDER BY gr.analyzed_at DESC
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+        return list(self.iter_all_game_results())
 
     # ==================== PROCESSING LOG OPERATIONS ====================
 
+    @staticmethod
+    def _write_processing_status(conn: sqlite3.Connection, video_id: str, status: str,
+                                 error_message: str = None):
+        """Insert or bump the processing_log row for a video without committing"""
+        # Check if record exists
+        cursor = conn.execute(
+            "SELECT attempt_count FROM processing_log WHERE video_id = ?",
+            (video_id,)
+        )
+        row = cursor.fetchone()
+
+        if row:
+            # Update existing
+            attempt_count = row['attempt_count'] + 1
+            conn.execute("""
+                UPDATE processing_log
+                SET status = ?, error_message = ?, attempt_count = ?,
+                    last_attempt = CURRENT_TIMESTAMP
+                WHERE video_id = ?
+            """, (status, error_message, attempt_count, video_id))
+        else:
+            # Insert new
+            conn.execute("""
+                INSERT INTO processing_log (video_id, status, error_message, attempt_count)
+                VALUES (?, ?, ?, 1)
+            """, (video_id, status, error_message))
+
     def update_processing_status(self, video_id: str, status: str,
                                   error_message: str = None) -> bool:
         """Update processing status for a video"""
         try:
             with self.get_connection() as conn:
-                # Check if record exists
-                cursor = conn.execute(
-                    "SELECT attempt_count FROM processing_log WHERE video_id = ?",
-                    (video_id,)
-                )
-                row = cursor.fetchone()
-
-                if row:
-                    # Update existing
-                    attempt_count = row['attempt_count'] + 1
-                    conn.execute("""
-                        UPDATE processing_log
-                        SET status = ?, error_message = ?, attempt_count = ?,
-                            last_attempt = CURRENT_TIMESTAMP
-                        WHERE video_id = ?
-                    """, (status, error_message, attempt_count, video_id))
-                else:
-                    # Insert new
-                    conn.execute("""
-                        INSERT INTO processing_log (video_id, status, error_message, attempt_count)
-                        VALUES (?, ?, ?, 1)
-                    """, (video_id, status, error_message))
-
+                self._write_processing_status(conn, video_id, status, error_message)
                 conn.commit()
             return True
         except Exception as e:
@@ -275,51 +397,45 @@ class DatabaseManager:
 
     def get_videos_by_status(self, status: str) -> List[Dict]:
         """Get all videos with a specific processing status"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT v.*, pl.status, pl.last_attempt, pl.attempt_count
-                FROM videos v
-                LEFT JOIN processing_log pl ON v.video_id = pl.video_id
-                WHERE pl.status = ?
-                ORDER BY pl.last_attempt DESC
-            """, (status,))
-            return [dict(row) for row in cursor.fetchall()]
+        return list(self._iter_dicts("""
+            SELECT v.*, pl.status, pl.last_attempt, pl.attempt_count
+            FROM videos v
+            LEFT JOIN processing_log pl ON v.video_id = pl.video_id
+            WHERE pl.status = ?
+            ORDER BY pl.last_attempt DESC
+        """, (status,)))
 
     def get_unprocessed_videos(self) -> List[Dict]:
         """Get videos that haven't been analyzed yet"""
-        with self.get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT v.* FROM videos v
-                LEFT JOIN processing_log pl ON v.video_id = pl.video_id
-                WHERE pl.video_id IS NULL OR pl.status = 'failed'
-                ORDER BY v.published_at DESC
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+        return list(self._iter_dicts("""
+            SELECT v.* FROM videos v
+            LEFT JOIN processing_log pl ON v.video_id = pl.video_id
+            WHERE pl.video_id IS NULL OR pl.status = 'failed'
+            ORDER BY v.published_at DESC
+        """))
 
     # ==================== STATS & UTILITIES ====================
 
     def get_stats(self) -> Dict:
         """Get database statistics"""
-        with self.get_connection() as conn:
-            stats = {}
-
-            # Total videos
-            cursor = conn.execute("SELECT COUNT(*) as count FROM videos")
-            stats['total_videos'] = cursor.fetchone()['count']
-
-            # Total analyzed
-            cursor = conn.execute("SELECT COUNT(DISTINCT video_id) as count FROM game_results")
-            stats['analyzed_videos'] = cursor.fetchone()['count']
-
-            # By status
-            cursor = conn.execute("""
-                SELECT status, COUNT(*) as count
-                FROM processing_log
-                GROUP BY status
-            """)
-            stats['by_status'] = {row['status']: row['count'] for row in cursor.fetchall()}
+        # One statement instead of three round-trips: each branch yields
+        # (key, count) rows, status rows prefixed with 'status:'
+        rows = self.get_connection().execute("""
+            SELECT 'total_videos', COUNT(*) FROM videos
+            UNION ALL
+            SELECT 'analyzed_videos', COUNT(DISTINCT video_id) FROM game_results
+            UNION ALL
+            SELECT 'status:' || status, COUNT(*) FROM processing_log GROUP BY status
+        """).fetchall()
+
+        stats = {'total_videos': 0, 'analyzed_videos': 0, 'by_status': {}}
+        for key, count in rows:
+            if key.startswith('status:'):
+                stats['by_status'][key[len('status:'):]] = count
+            else:
+                stats[key] = count
 
-            return stats
+        return stats
 
     def clear_all_data(self):
         """Clear all data from database (use with caution!)"""
@@ -0,0 +1,62 @@
+"""
+Versioned migrations for the game_results table
+
+Each migration adds columns and bumps PRAGMA user_version, so an
+already-migrated database is recognised from one integer read.
+"""
+
+import sqlite3
+
+# (version, table, columns added) - applied in order
+MIGRATIONS = [
+    (1, 'game_results', ['player_a', 'player_b']),
+    (2, 'game_results', ['game_type', 'game_summary', 'commentary_summary']),
+]
+
+
+def run_migrations(db_path='database/dingerstats.db', target_version=None):
+    """Apply every migration above the database's user_version, up to target_version"""
+    if target_version is None:
+        target_version = MIGRATIONS[-1][0]
+
+    conn = sqlite3.connect(db_path)
+
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= target_version:
+            print(f"Database already at version {version}, nothing to migrate")
+            return
+
+        for migration_version, table, columns in MIGRATIONS:
+            if migration_version <= version or migration_version > target_version:
+                continue
+
+            conn.execute("BEGIN IMMEDIATE")
+
+            # Databases created from schema.sql already have these columns
+            # but start at user_version 0, so probe for them in one query
+            placeholders = ", ".join("?" for _ in columns)
+            existing = {row[0] for row in conn.execute(
+                f"SELECT name FROM pragma_table_info('{table}') WHERE name IN ({placeholders})",
+                columns
+            )}
+
+            for column in columns:
+                if column not in existing:
+                    print(f"Adding {column} column...")
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+            conn.execute(f"PRAGMA user_version = {migration_version}")
+            conn.commit()
+
+        print("Migration complete!")
+
+    except Exception as e:
+        print(f"Error: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -1,34 +1,14 @@
 """
 Migration: Add player_a and player_b columns to game_results table
+
+Thin wrapper over migrate.run_migrations (user_version 1); earlier
+versions are applied first if the database hasn't had them yet.
 """
 
-import sqlite3
+from migrate import run_migrations
 
 def migrate():
-    conn = sqlite3.connect('database/dingerstats.db')
-    cursor = conn.cursor()
-
-    try:
-        # Check if columns already exist
-        cursor.execute("PRAGMA table_info(game_results)")
-        columns = [col[1] for col in cursor.fetchall()]
-
-        if 'player_a' not in columns:
-            print("Adding player_a column...")
-            cursor.execute("ALTER TABLE game_results ADD COLUMN player_a TEXT")
-
-        if 'player_b' not in columns:
-            print("Adding player_b column...")
-            cursor.execute("ALTER TABLE game_results ADD COLUMN player_b TEXT")
-
-        conn.commit()
-        print("Migration complete!")
-
-    except Exception as e:
-        print(f"Error: {e}")
-        conn.rollback()
-    finally:
-        conn.close()
+    run_migrations(target_version=1)
 
 if __name__ == "__main__":
     migrate()
@@ -53,3 +53,5 @@ CREATE INDEX IF NOT EXISTS idx_videos_video_id ON videos(video_id);
 CREATE INDEX IF NOT EXISTS idx_videos_playlist ON videos(playlist_id);
 CREATE INDEX IF NOT EXISTS idx_game_results_video ON game_results(video_id);
 CREATE INDEX IF NOT EXISTS idx_processing_status ON processing_log(status);
+CREATE INDEX IF NOT EXISTS idx_processing_video ON processing_log(video_id);  -- LEFT JOINs from videos
+CREATE INDEX IF NOT EXISTS idx_videos_published ON videos(published_at);  -- ORDER BY published_at DESC
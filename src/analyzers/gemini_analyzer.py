@@ -31,6 +31,10 @@ class GeminiAnalyzer:
         self.client = genai.Client(api_key=self.api_key)
         self.model = model or DEFAULT_GEMINI_MODEL
 
+        # Optional callable run before every request attempt, retries
+        # included, e.g. a rate limiter shared by several worker threads
+        self.request_gate = None
+
     def analyze_video_with_retry(self, video_url: str, prompt: str, max_retries: int = 3) -> str:
         """
         Analyze video with retry logic that respects Gemini's rate limit delays
@@ -45,6 +49,8 @@ class GeminiAnalyzer:
         """
         for attempt in range(max_retries + 1):
             try:
+                if self.request_gate:
+                    self.request_gate()
                 response = self.client.models.generate_content(
                     model=self.model,
                     contents=types.Content(
@@ -227,6 +233,8 @@ class GeminiAnalyzer:
 
         try:
             # Make the API call
+            if self.request_gate:
+                self.request_gate()
             response = self.client.models.generate_content(
                 model=self.model,
                 contents=types.Content(parts=parts)
@@ -35,13 +35,7 @@ def reprocess_classic10_with_v2_flash15():
     all_videos = db.get_videos_by_playlist(CLASSIC_10_PLAYLIST)
 
     # Get videos that already have v2 results to skip them
-    with db.get_connection() as conn:
-        cursor = conn.execute("""
-            SELECT DISTINCT video_id
-            FROM game_results
-            WHERE prompt_version = 'v2'
-        """)
-        processed_video_ids = {row['video_id'] for row in cursor.fetchall()}
+    processed_video_ids = db.get_processed_video_ids(prompt_version='v2')
 
     # Filter to only unprocessed videos
     videos = [v for v in all_videos if v['video_id'] not in processed_video_ids]
@@ -5,8 +5,11 @@ Fetch videos from Dinger City, analyze with Gemini, and store results
 
 import os
 import sys
+import threading
 import time
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict
 from dotenv import load_dotenv
 
@@ -107,15 +110,21 @@ class DingerStatsPipeline:
         try:
             # Analyze with Gemini
             result, raw_response = self.gemini.analyze_game_video(video_id, video_url)
+        except Exception as e:
+            return self._record_failure(video_id, str(e))
+
+        return self._store_analysis(video_id, result, raw_response)
 
+    def _store_analysis(self, video_id: str, result: Dict, raw_response: str) -> bool:
+        """Store a Gemini analysis for a video and update its processing status"""
+        try:
             if result:
                 # Store result
                 result['video_id'] = video_id
                 result['raw_response'] = raw_response
-                success = self.db.insert_game_result(result)
+                success = self.db.complete_game_result(result)
 
                 if success:
-                    self.db.update_processing_status(video_id, 'completed')
                     # Display player names (primary) and team names (secondary)
                     player_display = f"{result.get('player_a', '?')} vs {result.get('player_b', '?')}"
                     team_display = f"({result.get('team_a', '?')} vs {result.get('team_b', '?')})"
@@ -131,18 +140,27 @@ class DingerStatsPipeline:
                 return False
 
         except Exception as e:
-            error_msg = str(e)
-            self.db.update_processing_status(video_id, 'failed', error_msg)
-            print(f"  [FAIL] Error - {error_msg}")
-            return False
+            return self._record_failure(video_id, str(e))
+
+    def _record_failure(self, video_id: str, error_msg: str) -> bool:
+        """Mark a video failed with an error message"""
+        self.db.update_processing_status(video_id, 'failed', error_msg)
+        print(f"  [FAIL] Error - {error_msg}")
+        return False
 
-    def process_unanalyzed_videos(self, max_videos: int = None, delay: float = 6.0):
+    def process_unanalyzed_videos(self, max_videos: int = None, delay: float = 6.0,
+                                  max_in_flight: int = 1):
         """
         Process all videos that haven't been analyzed yet
 
         Args:
             max_videos: Maximum number of videos to process (None = all)
-            delay: Delay in seconds between API calls (default 6 for free tier rate limit)
+            delay: Minimum spacing in seconds between the starts of any two
+                Gemini requests, rate-limit retries included (default 6 for
+                free tier rate limit). Time spent on a request counts toward
+                the spacing before the next one.
+            max_in_flight: Maximum Gemini requests running at once. Above 1,
+                analyzer messages from different videos can interleave.
 
         Note: Gemini API only supports 1 YouTube video per request
         Free tier: 250 requests/day, so max 250 videos/day
@@ -165,16 +183,55 @@ class DingerStatsPipeline:
 
         print(f"  Rate limit: {delay}s between requests\n")
 
-        success_count = 0
-        for i, video in enumerate(videos, 1):
-            print(f"[{i}/{len(videos)}] {video['title'][:70]}...")
+        # Requests run on worker threads, spaced by a start-time gate the
+        # analyzer takes before every attempt (so its own 429 retries are
+        # spaced too) rather than by sleeping after each video finishes.
+        # Database writes stay on this thread (its connection is per-thread)
+        # and happen in submission order while later requests are in flight.
+        rate_lock = threading.Lock()
+        next_start = time.monotonic()
+
+        def wait_for_request_slot():
+            nonlocal next_start
+            with rate_lock:
+                now = time.monotonic()
+                start = max(now, next_start)
+                next_start = start + delay
+            time.sleep(start - now)
 
-            if self.analyze_video(video['video_id']):
+        success_count = 0
+        pending = deque()
+
+        def store_oldest():
+            nonlocal success_count
+            i, video, future = pending.popleft()
+            if max_in_flight > 1:
+                print(f"[{i}/{len(videos)}] result:")
+            try:
+                result, raw_response = future.result()
+            except Exception as e:
+                self._record_failure(video['video_id'], str(e))
+                return
+            if self._store_analysis(video['video_id'], result, raw_response):
                 success_count += 1
 
-            # Rate limiting
-            if i < len(videos):  # Don't sleep after last video
-                time.sleep(delay)
+        self.gemini.request_gate = wait_for_request_slot
+        try:
+            with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+                for i, video in enumerate(videos, 1):
+                    # Store finished results (or wait for a free slot)
+                    while pending and (pending[0][2].done() or len(pending) >= max_in_flight):
+                        store_oldest()
+
+                    print(f"[{i}/{len(videos)}] {video['title'][:70]}...")
+                    self.db.update_processing_status(video['video_id'], 'processing')
+                    future = pool.submit(self.gemini.analyze_game_video, video['video_id'])
+                    pending.append((i, video, future))
+
+                while pending:
+                    store_oldest()
+        finally:
+            self.gemini.request_gate = None
 
         print(f"\n{'='*60}")
         print(f"COMPLETE: {success_count}/{len(videos)} successful ({success_count/len(videos)*100:.1f}%)")
@@ -12,7 +12,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from webapp.backend.stats_calculator import StatsCalculator
 from webapp.backend.processing_stats import ProcessingStats
-from webapp.generate_tournament_pages import generate_all_tournament_pages
+from webapp.generate_tournament_pages import generate_all_tournament_pages, write_page
 
 def generate_static_site():
     """Generate static HTML with embedded data"""
@@ -62,8 +62,7 @@ def generate_static_site():
 
     # Write output
     output_path = os.path.join(os.path.dirname(__file__), 'frontend', 'index.html')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    write_page(output_path, html)
 
     print(f"\nMain site generated: {output_path}")
 
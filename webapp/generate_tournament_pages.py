@@ -15,6 +15,17 @@ from webapp.backend.stats_calculator import StatsCalculator
 from database.db_manager import DatabaseManager
 from src.utils.player_normalizer import normalize_player_name
 
+def write_page(output_path, html):
+    """
+    Write a generated page atomically: to a temp file beside it, then
+    os.replace over the old one, so the site being served never sees a
+    half-written page
+    """
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    os.replace(tmp_path, output_path)
+
 def parse_round_from_game_type(game_type):
     """Extract round number from game type like 'Classic 10 - Round 1 - Elimination'"""
     if not game_type:
@@ -191,8 +202,7 @@ def generate_tournament_page(season_name, season_data_multi_source, template_pat
     output_path = os.path.join(output_dir, filename)
 
     # Write output
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    write_page(output_path, html)
 
     print(f"  [OK] Generated: {filename} ({total_games} games)")
     return output_path